@@ -8,6 +8,8 @@ import math
 
 import numpy as np
 
+import instrumentation
+
 
 def skewMatrix(vector):
     """
@@ -110,6 +112,10 @@ outside of the tested range, the zero vector is returned."""
     return (angle, axis)
 
 
+instrumentation.registerModule(__name__)
+
+
+
 if "__main__" == __name__:
     # Should return the skew diagonal matrix as described in (7.2) of Bullo and Smith
     print(skewMatrix([1,2,3]))
@@ -0,0 +1,175 @@
+import numpy as np
+
+import instrumentation
+import robustPredicates
+
+
+def computeOrientations(p, q, points):
+    """
+Array version of the orientation determinant.  Returns the z component of
+(q - p) x (points - p) for every row of the N x 2 array points, which is
+positive where the point is to the left of the directed line p-q, negative
+to the right and zero on it.  p and q may also be N x 2 arrays.  The values
+are plain floating point, so their signs can be wrong for points very close
+to the line; use computeOrientationSigns() when the sign is what matters."""
+    p = np.asarray(p, dtype=float)
+    q = np.asarray(q, dtype=float)
+    points = np.asarray(points, dtype=float)
+
+    return (q[..., 0] - p[..., 0]) * (points[..., 1] - p[..., 1]) \
+        - (q[..., 1] - p[..., 1]) * (points[..., 0] - p[..., 0])
+
+def computeOrientationSigns(p, q, points):
+    """
+Array version of robustPredicates.orientation().  Returns 1, -1 or 0 for
+every row of points, exactly.  The determinants are computed in floating
+point with the same error bound as orientation(), and only the rows too
+close to zero to trust are recomputed one by one with orientation(), so
+they show up in robustPredicates.getPredicateStatistics()."""
+    (p, q, points) = np.broadcast_arrays(np.asarray(p, dtype=float),
+                                         np.asarray(q, dtype=float),
+                                         np.asarray(points, dtype=float))
+    shape = points.shape[:-1]
+    (p, q, points) = (p.reshape(-1, 2), q.reshape(-1, 2), points.reshape(-1, 2))
+
+    detLeft = (p[:, 0] - points[:, 0]) * (q[:, 1] - points[:, 1])
+    detRight = (p[:, 1] - points[:, 1]) * (q[:, 0] - points[:, 0])
+    determinant = detLeft - detRight
+    errorBound = robustPredicates.ORIENTATION_ERROR_BOUND \
+        * (np.abs(detLeft) + np.abs(detRight))
+
+    signs = np.sign(determinant).astype(int)
+    # when both products are exactly zero the determinant is too
+    uncertain = (np.abs(determinant) <= errorBound) \
+        & ~((detLeft == 0) & (detRight == 0))
+    uncertainRows = np.nonzero(uncertain)[0]
+
+    robustPredicates.addOrientationTests(len(signs) - len(uncertainRows))
+    for row in uncertainRows:
+        signs[row] = robustPredicates.orientation(p[row], q[row], points[row])
+
+    return signs.reshape(shape)
+
+def _isOnSegment(starts, ends, points):
+    """
+For points already known to be collinear with their segments, checks if
+they are inside the segments' bounding boxes."""
+    return (np.minimum(starts[..., 0], ends[..., 0]) <= points[..., 0]) \
+        & (points[..., 0] <= np.maximum(starts[..., 0], ends[..., 0])) \
+        & (np.minimum(starts[..., 1], ends[..., 1]) <= points[..., 1]) \
+        & (points[..., 1] <= np.maximum(starts[..., 1], ends[..., 1]))
+
+def doSegmentsIntersectSegment(starts, ends, p, q):
+    """
+Array version of collisionDetection.doTwoSegmentsIntersect().  starts and
+ends are N x 2 arrays holding the endpoints of N segments, and each of them
+is tested against the segment p-q.  Returns a boolean array of length N
+that is True where the segments share at least one point.
+
+Instead of solving for the intersection parameters it uses the four
+orientation tests, which handles the parallel and co-linear cases without
+any division.  They are exact, with computeOrientationSigns(), so the
+answers are the same as robustPredicates.doSegmentsIntersect()'s even for
+nearly co-linear segments."""
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+    p = np.asarray(p, dtype=float)
+    q = np.asarray(q, dtype=float)
+
+    o1 = computeOrientationSigns(starts, ends, p)
+    o2 = computeOrientationSigns(starts, ends, q)
+    o3 = computeOrientationSigns(p, q, starts)
+    o4 = computeOrientationSigns(p, q, ends)
+
+    properlyCrossing = (o1 * o2 < 0) & (o3 * o4 < 0)
+
+    pBroadcast = np.broadcast_to(p, starts.shape)
+    qBroadcast = np.broadcast_to(q, starts.shape)
+    touching = ((o1 == 0) & _isOnSegment(starts, ends, pBroadcast)) \
+        | ((o2 == 0) & _isOnSegment(starts, ends, qBroadcast)) \
+        | ((o3 == 0) & _isOnSegment(pBroadcast, qBroadcast, starts)) \
+        | ((o4 == 0) & _isOnSegment(pBroadcast, qBroadcast, ends))
+
+    return properlyCrossing | touching
+
+def arePointsInPolygon(points, polygon):
+    """
+Array version of collisionDetection.isPointInPolygon().  Returns a boolean
+array that is True for every row of the N x 2 array points that is inside
+polygon, using the even-odd rule with a horizontal ray.  Points exactly on
+the boundary may go either way; pair it with doSegmentsIntersectPolygon()
+when the boundary matters."""
+    points = np.asarray(points, dtype=float)
+    polygon = np.asarray(polygon, dtype=float)
+    x = points[..., 0]
+    y = points[..., 1]
+
+    inside = np.zeros(x.shape, dtype=bool)
+    for i in range(len(polygon)):
+        (x1, y1) = polygon[i - 1]
+        (x2, y2) = polygon[i]
+        if (y1 == y2):
+            continue
+        straddles = (y1 > y) != (y2 > y)
+        crossingX = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= straddles & (x < crossingX)
+
+    return inside
+
+def doSegmentsIntersectPolygon(starts, ends, polygon):
+    """
+Checks N segments against one polygon at once.  A segment collides with
+the polygon if it crosses or touches one of the polygon's sides, or if it
+lies entirely inside it, in which case its first endpoint is inside.
+Returns a boolean array of length N."""
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+
+    collides = arePointsInPolygon(starts, polygon)
+    for i in range(len(polygon)):
+        collides |= doSegmentsIntersectSegment(starts, ends,
+                                               polygon[i - 1], polygon[i])
+
+    return collides
+
+def doSegmentsIntersectPolygons(starts, ends, polygons):
+    """
+doSegmentsIntersectPolygon() for a list of polygons.  Returns a boolean
+array that is True where a segment collides with any of them."""
+    starts = np.asarray(starts, dtype=float)
+    ends = np.asarray(ends, dtype=float)
+
+    collides = np.zeros(starts.shape[:-1], dtype=bool)
+    for polygon in polygons:
+        # only the segments that are still free need to be checked
+        free = ~collides
+        if (not free.any()):
+            break
+        collides[free] = doSegmentsIntersectPolygon(starts[free], ends[free],
+                                                    polygon)
+
+    return collides
+
+
+instrumentation.registerModule(__name__)
+
+
+
+if "__main__" == __name__:
+    print("doSegmentsIntersectSegment()")
+    referenceSegment = [[0, 0], [1, 0]]
+    starts = [[0, 1], [0.5, 0], [3, 0], [0.5, -0.5], [3, -0.5]]
+    ends = [[1, 1], [1.5, 0], [4, 0], [0.5, 0.5], [3, 0.5]]
+    print(doSegmentsIntersectSegment(starts, ends, *referenceSegment))
+    # [False, True, False, True, False]
+
+    print("\narePointsInPolygon()")
+    triangle = [[0, 0], [1, 0], [0, 1]]
+    print(arePointsInPolygon([[0.25, 0.25], [0.75, 0.75], [3, 3]], triangle))
+    # [True, False, False]
+
+    print("\ndoSegmentsIntersectPolygon()")
+    print(doSegmentsIntersectPolygon([[0.1, 0.1], [2, 2], [-1, 0.5]],
+                                     [[0.2, 0.2], [3, 3], [1, 0.5]],
+                                     triangle))
+    # [True, False, True]
@@ -0,0 +1,344 @@
+#
+# benchmarks.py
+#
+# Times the geometry, sampling and search functions on synthetic workloads
+# of several sizes and compares the results to a stored baseline.
+#
+#   python benchmarks.py --output results.json
+#   python benchmarks.py --save-baseline baseline.json
+#   python benchmarks.py --baseline baseline.json --threshold 0.25
+#   python benchmarks.py --import-budget-ms 30
+#
+# Everything is generated from a fixed seed, so it runs offline and the
+# workloads are the same from run to run.
+#
+
+import argparse
+import importlib
+import json
+import math
+import platform
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+
+def regularPolygon(numberOfVertices, radius=1.0, center=(0, 0)):
+    return [ [ center[0] + radius * math.cos(2 * math.pi * i / numberOfVertices),
+               center[1] + radius * math.sin(2 * math.pi * i / numberOfVertices) ]
+             for i in range(numberOfVertices) ]
+
+def randomPoints(generator, count, low=-1.5, high=1.5):
+    return [ [ generator.uniform(low, high), generator.uniform(low, high) ]
+             for _ in range(count) ]
+
+def gridGraph(side):
+    """
+Adjacency table of a side x side 4-connected grid."""
+    return [ [ n for n in (node - side if node >= side else None,
+                           node + side if node < side * (side - 1) else None,
+                           node - 1 if node % side else None,
+                           node + 1 if (node + 1) % side else None)
+               if n is not None ]
+             for node in range(side * side) ]
+
+
+# Each setup function takes the workload size and returns (operations,
+# run), where run() does that many operations of the function being timed.
+
+def setupSegmentIntersection(numberOfPairs):
+    import collisionDetection
+
+    generator = random.Random(0)
+    pairs = [ (randomPoints(generator, 2), randomPoints(generator, 2))
+              for _ in range(numberOfPairs) ]
+
+    def run():
+        for (segment1, segment2) in pairs:
+            collisionDetection.doTwoSegmentsIntersect(segment1, segment2)
+
+    return (numberOfPairs, run)
+
+def setupPointInPolygon(numberOfVertices):
+    import collisionDetection
+
+    polygon = regularPolygon(numberOfVertices)
+    points = randomPoints(random.Random(1), 100)
+
+    def run():
+        for point in points:
+            collisionDetection.isPointInPolygon(point, polygon)
+
+    return (len(points), run)
+
+def setupDistancePointToPolygon(numberOfVertices):
+    import polygons
+
+    polygon = regularPolygon(numberOfVertices)
+    points = randomPoints(random.Random(2), 100)
+
+    def run():
+        for point in points:
+            polygons.computeDistancePointToPolygon(polygon, point)
+
+    return (len(points), run)
+
+def setupBFSTree(numberOfNodes):
+    import breadthFirstSearch
+
+    adjacencyTable = gridGraph(int(round(numberOfNodes ** 0.5)))
+
+    def run():
+        breadthFirstSearch.computeBFSTree(adjacencyTable, 0)
+
+    return (1, run)
+
+def setupGridHalton(numberOfSamples):
+    import grid
+
+    def run():
+        grid.computeGridHalton(numberOfSamples, 2, 3)
+
+    return (1, run)
+
+def setupRMfromAA(numberOfRotations):
+    rotations = importlib.import_module("3dRotations")
+
+    generator = random.Random(3)
+    angleAxes = [ ]
+    for _ in range(numberOfRotations):
+        axis = [ generator.gauss(0, 1) for _ in range(3) ]
+        norm = sum(a ** 2 for a in axis) ** 0.5
+        angleAxes.append((generator.uniform(0, 2 * math.pi),
+                          [ a / norm for a in axis ]))
+
+    def run():
+        for (angle, axis) in angleAxes:
+            rotations.computeRMfromAA(angle, axis)
+
+    return (numberOfRotations, run)
+
+def setupBug1(numberOfObstacles):
+    import bug1
+
+    # a row of small triangles across the straight line to the goal
+    obstacles = [ [ [ 1 + 2 * i, -0.5 ], [ 1.5 + 2 * i, 0.5 ],
+                    [ 2 + 2 * i, -0.5 ] ]
+                  for i in range(numberOfObstacles) ]
+    goal = [ 2 * numberOfObstacles + 1, 0.3 ]
+
+    def run():
+        bug1.computeBug1([0, 0.3], goal, obstacles, 0.1)
+
+    return (1, run)
+
+
+# (name, setup, sizes, the parameter the sizes are)
+BENCHMARKS = [
+    ("doTwoSegmentsIntersect", setupSegmentIntersection, [ 1000 ], "pairs"),
+    ("isPointInPolygon", setupPointInPolygon, [ 8, 64, 512 ], "vertices"),
+    ("computeDistancePointToPolygon", setupDistancePointToPolygon,
+     [ 8, 64, 512 ], "vertices"),
+    ("computeBFSTree", setupBFSTree, [ 1024, 16384 ], "nodes"),
+    ("computeGridHalton", setupGridHalton, [ 1000, 10000 ], "samples"),
+    ("computeRMfromAA", setupRMfromAA, [ 1000 ], "rotations"),
+    ("computeBug1", setupBug1, [ 1, 4 ], "obstacles"),
+]
+
+
+# modules that short-lived planner workers import, whose cold start is
+# checked against the import budget, each with a first call to time along
+# with the import, since that is where deferred imports are paid for
+IMPORT_TIME_MODULES = [
+    ("bug1", "bug1.computeBug1([0, 0], [3, 1], "
+             "[ [[1, -1], [2, -1], [2, 2], [1, 2]] ], 0.1)"),
+    ("collisionDetection", "collisionDetection.isPointInPolygon("
+                           "[0.25, 0.25], [[0, 0], [1, 0], [0, 1]])"),
+]
+
+
+def measureImportTime(moduleName, firstCall=None, repeats=5):
+    """
+Imports moduleName in a fresh interpreter repeats times and returns the
+fastest time in milliseconds.  If firstCall, a Python statement using the
+module, is given, the import and that statement are timed together, which
+includes anything the module only imports on its first use.  Interpreter
+startup itself isn't included."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    program = "\n".join([ "import sys, time",
+                          "start = time.perf_counter()",
+                          "import " + moduleName,
+                          firstCall or "pass",
+                          "elapsed = time.perf_counter() - start",
+                          "sys.stdout = sys.__stdout__",
+                          "print(1000 * elapsed)" ])
+    best = float("infinity")
+    for _ in range(repeats):
+        completed = subprocess.run(
+            [ sys.executable, "-c", program ],
+            cwd=directory, capture_output=True, text=True, check=True)
+        best = min(best, float(completed.stdout.splitlines()[-1]))
+
+    return best
+
+def timeRun(operations, run, minimumTime):
+    """
+Calls run() until at least minimumTime seconds have passed and returns
+the operations per second of the fastest call, which is the least
+disturbed by anything else happening on the machine."""
+    run()  # warm up
+    best = float("infinity")
+    elapsed = 0.0
+    while (elapsed < minimumTime):
+        start = time.perf_counter()
+        run()
+        duration = time.perf_counter() - start
+        best = min(best, duration)
+        elapsed = elapsed + duration
+
+    return operations / best
+
+def measurePeakMemory(run):
+    """
+Peak memory allocated by Python during one call to run(), in bytes.  This
+is done separately from the timing because tracemalloc slows every
+allocation down."""
+    tracemalloc.start()
+    try:
+        run()
+        (_, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak
+
+def runBenchmarks(minimumTime=0.2, nameFilter=None, log=sys.stderr,
+                  measureImports=True):
+    """
+Runs every benchmark whose name contains nameFilter and returns a
+dictionary mapping "name[parameter=size]" to its operations per second
+and peak memory.  Unless measureImports is False, the cold start of each of
+IMPORT_TIME_MODULES is measured too, both the import alone and the import
+with a first call.  Benchmarks whose module can't be imported (for example
+when matplotlib isn't installed) are reported under "skipped"."""
+    results = { }
+    skipped = { }
+    for (name, setup, sizes, parameter) in BENCHMARKS:
+        if (nameFilter is not None and nameFilter not in name):
+            continue
+        for size in sizes:
+            key = "%s[%s=%d]" % (name, parameter, size)
+            try:
+                (operations, run) = setup(size)
+            except ImportError as error:
+                skipped[key] = str(error)
+                print("%-50s skipped: %s" % (key, error), file=log)
+                continue
+
+            opsPerSecond = timeRun(operations, run, minimumTime)
+            peakMemory = measurePeakMemory(run)
+            results[key] = { "opsPerSecond": opsPerSecond,
+                             "peakMemoryBytes": peakMemory }
+            print("%-50s %14.1f ops/s %12d B peak"
+                  % (key, opsPerSecond, peakMemory), file=log)
+
+    importTimes = { }
+    firstCallTimes = { }
+    if (measureImports):
+        for (moduleName, firstCall) in IMPORT_TIME_MODULES:
+            importTimes[moduleName] = measureImportTime(moduleName)
+            firstCallTimes[moduleName] = measureImportTime(moduleName,
+                                                           firstCall)
+            print("%-50s %14.1f ms" % ("import " + moduleName,
+                                        importTimes[moduleName]), file=log)
+            print("%-50s %14.1f ms" % ("import and first call " + moduleName,
+                                        firstCallTimes[moduleName]), file=log)
+
+    return { "python": platform.python_version(),
+             "machine": platform.machine(),
+             "results": results,
+             "importTimesMs": importTimes,
+             "firstCallTimesMs": firstCallTimes,
+             "skipped": skipped }
+
+def compareToBaseline(report, baseline, threshold):
+    """
+Returns a list of human readable regressions: benchmarks that got slower
+or use more memory than the baseline by more than the fraction threshold.
+Benchmarks missing from either report are ignored."""
+    regressions = [ ]
+    for (key, current) in report["results"].items():
+        if (key not in baseline["results"]):
+            continue
+        previous = baseline["results"][key]
+
+        if (current["opsPerSecond"]
+            < previous["opsPerSecond"] * (1 - threshold)):
+            regressions.append("%s: %.1f ops/s, baseline %.1f ops/s"
+                               % (key, current["opsPerSecond"],
+                                  previous["opsPerSecond"]))
+        if (current["peakMemoryBytes"]
+            > previous["peakMemoryBytes"] * (1 + threshold)):
+            regressions.append("%s: %d B peak, baseline %d B peak"
+                               % (key, current["peakMemoryBytes"],
+                                  previous["peakMemoryBytes"]))
+
+    return regressions
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the geometry, sampling and search functions.")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against this JSON file")
+    parser.add_argument("--save-baseline",
+                        help="write the results as the new baseline to this file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fraction a benchmark may regress before failing (default 0.2)")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="seconds to spend timing each workload (default 0.2)")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--import-budget-ms", type=float, default=50.0,
+                        help="fail if importing %s and calling it once takes "
+                             "longer (default 50)"
+                        % " or ".join(name for (name, _) in IMPORT_TIME_MODULES))
+    parser.add_argument("--skip-import-times", action="store_true",
+                        help="don't measure the import and first call times")
+    options = parser.parse_args(arguments)
+
+    report = runBenchmarks(options.min_time, options.filter,
+                           measureImports=not options.skip_import_times)
+    failed = False
+
+    for (moduleName, milliseconds) in report["firstCallTimesMs"].items():
+        if (milliseconds > options.import_budget_ms):
+            print("OVER BUDGET import and first call %s: %.1f ms, budget %.1f ms"
+                  % (moduleName, milliseconds, options.import_budget_ms),
+                  file=sys.stderr)
+            failed = True
+
+    for path in (options.output, options.save_baseline):
+        if (path is not None):
+            with open(path, "w") as outputFile:
+                json.dump(report, outputFile, indent=2, sort_keys=True)
+
+    if (options.baseline is not None):
+        with open(options.baseline) as baselineFile:
+            baseline = json.load(baselineFile)
+        regressions = compareToBaseline(report, baseline, options.threshold)
+        for regression in regressions:
+            print("REGRESSION " + regression, file=sys.stderr)
+        if (regressions):
+            failed = True
+        else:
+            print("no regressions beyond %.0f%%" % (100 * options.threshold),
+                  file=sys.stderr)
+
+    return 1 if failed else 0
+
+
+
+if "__main__" == __name__:
+    sys.exit(main())
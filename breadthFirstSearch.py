@@ -5,6 +5,9 @@
 #
 
 import math
+from collections import deque
+
+import instrumentation
 
 def computeBFSTree(adjacencyTable, startNode):
     assert startNode < len(adjacencyTable), "computeBFSTree: startNode must be the index of a node in adjacencyTable"
@@ -12,23 +15,22 @@ def computeBFSTree(adjacencyTable, startNode):
     parents = [ None for _ in range(len(adjacencyTable)) ]
     parents[startNode] = -1  # -1 here will be used to indicate lack of parent
 
+    # a node is queued exactly when it is given a parent, so checking
+    # parents avoids scanning parentsInOrder for membership
     parentsInOrder = [ startNode ]
     parentIndex = 0
-    
-    while None in parents:
-        try:
-            for i in adjacencyTable[parentsInOrder[parentIndex]]:
-                if parents[i] is None:
-                    parents[i] = parentsInOrder[parentIndex]
-                    
-                if i not in parentsInOrder:
-                    parentsInOrder.append(i)
-                        
-            parentIndex = parentIndex + 1
 
-        except IndexError:
-            print("computeBFSTree: adjacencyTable represents a disconnected graph!  A complete tree could not be made.")
-            return []
+    while parentIndex < len(parentsInOrder):
+        for i in adjacencyTable[parentsInOrder[parentIndex]]:
+            if parents[i] is None:
+                parents[i] = parentsInOrder[parentIndex]
+                parentsInOrder.append(i)
+
+        parentIndex = parentIndex + 1
+
+    if len(parentsInOrder) < len(adjacencyTable):
+        print("computeBFSTree: adjacencyTable represents a disconnected graph!  A complete tree could not be made.")
+        return []
 
     return parents
 
@@ -54,10 +56,46 @@ def computeBFSPath(adjacencyTable, startNode, goalNode):
                     
 
     path.reverse()
-    
+
     return path
 
 
+def computeBFSPathFromNeighbors(neighbors, startNode, goalNode):
+    """
+Breadth first search for graphs that are too big to hold as an adjacency
+table, such as the cells of an occupancy grid.  neighbors is a function
+that takes a node and returns an iterable of the nodes adjacent to it, and
+nodes can be anything hashable.  The search stops as soon as goalNode is
+reached, so unlike computeBFSPath() the graph doesn't need to be connected.
+
+Returns the list of nodes from startNode to goalNode, or an empty list if
+goalNode can't be reached."""
+    parents = { startNode: None }
+    queue = deque([ startNode ])
+
+    while queue:
+        node = queue.popleft()
+        if node == goalNode:
+            path = [ goalNode ]  # this will be reversed at the end
+            while parents[path[-1]] is not None:
+                path.append(parents[path[-1]])
+            path.reverse()
+
+            return path
+
+        for neighbor in neighbors(node):
+            if neighbor not in parents:
+                parents[neighbor] = node
+                queue.append(neighbor)
+
+    print("computeBFSPathFromNeighbors: goalNode could not be reached from startNode.")
+    return []
+
+
+instrumentation.registerModule(__name__)
+
+
+
 if "__main__" == __name__:
     
     print("A simple triangle graph")
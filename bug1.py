@@ -1,3 +1,4 @@
+import instrumentation
 import polygons
 
 def distance(point1, point2):
@@ -20,7 +21,16 @@ def vectorFrom(point1, toPoint2):
              toPoint2[1] - point1[1] ]
     
 
-def computeBug1(start, goal, obstaclesList, stepSize):
+def computeBug1(start, goal, obstaclesList, stepSize, queryCache=None):
+    """
+Walks from start toward goal in steps of stepSize, walking around any
+obstacle in the way.  If queryCache, a queryCache.QueryCache, is given, the
+distances to the obstacles are looked up through it, which saves
+recomputing them when the walk goes over the same points again."""
+    computeDistancePointToPolygon = polygons.computeDistancePointToPolygon
+    if (queryCache is not None):
+        computeDistancePointToPolygon = queryCache.computeDistancePointToPolygon
+
     currentPosition = start
     path = [ start ]
 
@@ -30,7 +40,7 @@ def computeBug1(start, goal, obstaclesList, stepSize):
         closestObstacle = None
         closestObstacleDistance = float("infinity")
         for obstacle in obstaclesList:
-            obstacleDistance = polygons.computeDistancePointToPolygon(
+            obstacleDistance = computeDistancePointToPolygon(
                 obstacle, currentPosition)
             if (obstacleDistance < closestObstacleDistance):
                 closestObstacle = obstacle
@@ -60,6 +70,9 @@ def computeBug1(start, goal, obstaclesList, stepSize):
     return path
 
 
+instrumentation.registerModule(__name__)
+
+
 
 if "__main__" == __name__:
     # compute bug1 for an empty environment
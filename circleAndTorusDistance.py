@@ -1,6 +1,9 @@
-
 import math
 
+import numpy as np
+
+import instrumentation
+
 M_PI = math.pi
 
 def computeDistanceOnCircle(alpha, beta):
@@ -11,3 +14,181 @@ def computeDistanceOnTorus(alpha1, alpha2, beta1, beta2):
 
     return math.sqrt(computeDistanceOnCircle(alpha1, alpha2) ** 2 \
                      + computeDistanceOnCircle(beta1, beta2) ** 2)
+
+
+def computeDistanceMatrixOnCircle(alphas, betas):
+    """
+Array version of computeDistanceOnCircle().  Returns the len(alphas) x
+len(betas) matrix whose (i, j) entry is the distance on the circle between
+alphas[i] and betas[j]."""
+    alphas = np.asarray(alphas, dtype=float).reshape(-1, 1)
+    betas = np.asarray(betas, dtype=float).reshape(1, -1)
+    difference = np.mod(betas - alphas, 2 * M_PI)
+
+    return np.minimum(difference, 2 * M_PI - difference)
+
+def computeDistanceMatrixOnTorus(configurations1, configurations2):
+    """
+Array version of computeDistanceOnTorus() generalized to the n-torus.
+configurations1 is an N x n array and configurations2 is an M x n array of
+angles, and the N x M matrix of wrapped euclidian distances between every
+pair of rows is returned.  A 1-D array is treated as a single configuration.
+
+Raises an AssertionError if the two arrays don't have the same number of
+angles per configuration."""
+    configurations1 = np.atleast_2d(np.asarray(configurations1, dtype=float))
+    configurations2 = np.atleast_2d(np.asarray(configurations2, dtype=float))
+    assert configurations1.shape[1] == configurations2.shape[1], "computeDistanceMatrixOnTorus: configurations must have the same dimension"
+
+    squaredDistance = np.zeros((len(configurations1), len(configurations2)))
+    # looping over the dimension keeps the temporaries at N x M rather
+    # than N x M x n
+    for k in range(configurations1.shape[1]):
+        squaredDistance += computeDistanceMatrixOnCircle(
+            configurations1[:, k], configurations2[:, k]) ** 2
+
+    return np.sqrt(squaredDistance)
+
+
+TORUS_KD_TREE_LEAF_SIZE = 16
+
+def _buildTorusKDNode(points, indices):
+    lower = points[indices].min(axis=0)
+    upper = points[indices].max(axis=0)
+    node = { "lower": lower, "upper": upper }
+
+    if (len(indices) <= TORUS_KD_TREE_LEAF_SIZE):
+        node["indices"] = indices
+        return node
+
+    splitDimension = int(np.argmax(upper - lower))
+    order = np.argsort(points[indices, splitDimension], kind="stable")
+    half = len(indices) // 2
+    node["children"] = [ _buildTorusKDNode(points, indices[order[:half]]),
+                         _buildTorusKDNode(points, indices[order[half:]]) ]
+
+    return node
+
+def buildTorusKDTree(configurations):
+    """
+Builds a KD-tree over an N x n array of configurations on the n-torus.  The
+angles are wrapped into [0, 2 pi) and split along the widest dimension, so
+each node holds an ordinary bounding box.  The periodic topology is handled
+at query time by queryTorusKDTree() and queryTorusKDTreeRadius(), which
+measure the wrapped distance from the query to those boxes.
+
+Raises an AssertionError if there are no configurations."""
+    points = np.mod(np.atleast_2d(np.asarray(configurations, dtype=float)),
+                    2 * M_PI)
+    assert len(points) > 0, "buildTorusKDTree: configurations must not be empty"
+
+    return { "points": points,
+             "root": _buildTorusKDNode(points, np.arange(len(points))) }
+
+def _squaredDistanceToBoxOnTorus(configuration, lower, upper):
+    """
+Lower bound on the squared distance on the torus from configuration to any
+point in the box [lower, upper].  In each dimension the box is an arc of the
+circle, so the query is either on the arc or closest to one of its ends."""
+    toLower = np.mod(lower - configuration, 2 * M_PI)
+    toLower = np.minimum(toLower, 2 * M_PI - toLower)
+    toUpper = np.mod(upper - configuration, 2 * M_PI)
+    toUpper = np.minimum(toUpper, 2 * M_PI - toUpper)
+    inside = (configuration >= lower) & (configuration <= upper)
+    gap = np.where(inside, 0, np.minimum(toLower, toUpper))
+
+    return float(np.dot(gap, gap))
+
+def _squaredDistancesOnTorus(points, configuration):
+    difference = np.mod(points - configuration, 2 * M_PI)
+    difference = np.minimum(difference, 2 * M_PI - difference)
+
+    return np.einsum("ij,ij->i", difference, difference)
+
+def queryTorusKDTree(tree, configuration, k=1):
+    """
+Finds the k configurations in tree that are nearest to configuration on the
+torus.  Returns a pair (distances, indices) of lists sorted by increasing
+distance, where indices refer to the rows of the array the tree was built
+from.
+
+Raises an AssertionError if k isn't a positive integer."""
+    assert k > 0 and k == int(k), "queryTorusKDTree: k must be a positive integer"
+    configuration = np.mod(np.asarray(configuration, dtype=float), 2 * M_PI)
+    points = tree["points"]
+
+    # best holds (squared distance, index) sorted ascending, at most k long
+    best = [ ]
+    stack = [ tree["root"] ]
+    while stack:
+        node = stack.pop()
+        bound = _squaredDistanceToBoxOnTorus(configuration,
+                                             node["lower"], node["upper"])
+        if (len(best) == k and bound >= best[-1][0]):
+            continue
+
+        if ("indices" in node):
+            distances = _squaredDistancesOnTorus(points[node["indices"]],
+                                                 configuration)
+            best.extend(zip(distances.tolist(), node["indices"].tolist()))
+            best.sort()
+            del best[k:]
+        else:
+            # visit the nearer child first so the bound tightens sooner
+            children = sorted(node["children"],
+                              key=lambda child: _squaredDistanceToBoxOnTorus(
+                                  configuration, child["lower"], child["upper"]),
+                              reverse=True)
+            stack.extend(children)
+
+    return ([ math.sqrt(d) for (d, _) in best ], [ i for (_, i) in best ])
+
+def queryTorusKDTreeRadius(tree, configuration, radius):
+    """
+Finds every configuration in tree within radius of configuration on the
+torus.  Returns the list of their indices in no particular order."""
+    configuration = np.mod(np.asarray(configuration, dtype=float), 2 * M_PI)
+    points = tree["points"]
+    squaredRadius = radius ** 2
+
+    neighbors = [ ]
+    stack = [ tree["root"] ]
+    while stack:
+        node = stack.pop()
+        if (_squaredDistanceToBoxOnTorus(configuration, node["lower"],
+                                         node["upper"]) > squaredRadius):
+            continue
+
+        if ("indices" in node):
+            distances = _squaredDistancesOnTorus(points[node["indices"]],
+                                                 configuration)
+            neighbors.extend(node["indices"][distances <= squaredRadius].tolist())
+        else:
+            stack.extend(node["children"])
+
+    return neighbors
+
+
+instrumentation.registerModule(__name__)
+
+
+
+if "__main__" == __name__:
+    print("computeDistanceMatrixOnCircle()")
+    print(computeDistanceMatrixOnCircle([0, M_PI], [0.1, 2 * M_PI - 0.1]))
+    # [[0.1, 0.1], [pi - 0.1, pi - 0.1]]
+
+    print("\ncomputeDistanceMatrixOnTorus()")
+    print(computeDistanceMatrixOnTorus([[0, 0]], [[0.1, 2 * M_PI - 0.1]]))
+    # [[0.1414...]]
+    print(computeDistanceOnTorus(0, 0.1, 0, 2 * M_PI - 0.1))  # same
+
+    print("\nqueryTorusKDTree()")
+    samples = np.random.default_rng(0).uniform(0, 2 * M_PI, (2000, 2))
+    tree = buildTorusKDTree(samples)
+    query = [0.01, 2 * M_PI - 0.01]
+    bruteForce = computeDistanceMatrixOnTorus([query], samples)[0]
+    print(queryTorusKDTree(tree, query, 3))
+    print(sorted(bruteForce)[:3])  # same distances
+    print(sorted(queryTorusKDTreeRadius(tree, query, 0.2)))
+    print(sorted(np.nonzero(bruteForce <= 0.2)[0].tolist()))  # same indices
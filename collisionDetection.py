@@ -4,6 +4,9 @@
 # Fletcher Porter
 #
 
+import instrumentation
+import robustPredicates
+
 def isPoint(possiblePoint):
     """
 Returns true if possiblePoint is an iterable thing with length 2 whose elements are all real-valued numbers.  Complex numbers and strings will result in a False result."""
@@ -125,51 +128,13 @@ Raises an AssertionError is point is not a point as defined by isPoint() or if p
 
 def doTwoSegmentsIntersect(segment1, segment2):
     """
-Returns True if segments1 and segment2 intersect at at least one point.  It does this by computing whether the lines that contain each of segment1 and segment2 intersect using (4.2) in Bullo and Smith.  If they do, they are either co-linear or intersect at a point.  For the point case, it needs to be checked if the point on the line where the intersection occured is also on the segment.  For the co-linear case, an AABB is drawn around segment 2, and if a point on segment1 is in that box, then they must intersect.
+Returns True if segments1 and segment2 intersect at at least one point.  It does this with the orientation tests in robustPredicates: the segments intersect if the endpoints of each are on opposite sides of the line containing the other, or if an endpoint of one lies on the other.  Because the orientations are exact, nearly co-linear segments are decided correctly without needing a safety margin, and the floating point filter in robustPredicates.orientation() keeps the common case as cheap as computing (4.2) in Bullo and Smith directly.
 
 Raises an AssertionError if segment1 or segment2 are not segments as defined by isSegment()."""
     assert isSegment(segment1), "doTwoSegmentsIntersect: segment1 is not a list of 2 points"
     assert isSegment(segment2), "doTwoSegmentsIntersect: segment2 is not a list of 2 points"
-    
-    numerator_a = ((segment2[1][0] - segment2[0][0]) * \
-                   (segment1[0][1] - segment2[0][1]) - \
-                   (segment2[1][1] - segment2[0][1]) * \
-                   (segment1[0][0] - segment2[0][0]))
-    numerator_b = ((segment1[1][1] - segment1[0][1]) * \
-                   (segment1[0][0] - segment2[0][0]) + \
-                   (segment1[1][0] - segment1[0][0]) * \
-                   (segment1[0][1] - segment2[0][1]))
-                   
-    denominator = ((segment2[1][1] - segment2[0][1]) * \
-                   (segment1[1][0] - segment1[0][0]) - \
-                   (segment2[1][0] - segment2[0][0]) * \
-                   (segment1[1][1] - segment1[0][1]))
-
-    if (numerator_a != 0 and denominator == 0):
-
-        return False
-    elif (numerator_a == 0 and denominator == 0):
-        if (isInAABB(segment1[0], segment2)
-            or isInAABB(segment1[1], segment2)):
-            
-            return True
-        else:
 
-            return False
-
-    else:
-        s_a = numerator_a / denominator
-        s_b = numerator_b / denominator
-
-        if (s_a >= 0 and s_a <= 1
-            and s_b >= 0 and s_b <= 1):
-            
-            return True
-        else:
-
-            return False
-    
-    return True 
+    return robustPredicates.doSegmentsIntersect(segment1, segment2)
 
 
 def doTwoConvexPolygonsIntersect(polygon1, polygon2):
@@ -195,6 +160,9 @@ Raises an AssertionError if polygon1 or polygon2 are not polygons as defined by
     return False
 
 
+instrumentation.registerModule(__name__)
+
+
 
 if "__main__" == __name__:
     print("\nisPoint()")
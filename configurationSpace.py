@@ -0,0 +1,195 @@
+import hashlib
+import math
+import os
+
+import numpy as np
+
+import batchCollisionDetection
+import instrumentation
+
+
+def computeTwoLinkArmPositions(theta1, theta2, linkLengths, base=(0, 0)):
+    """
+Forward kinematics of a planar arm with two revolute joints.  theta1 is the
+angle of the first link from the x axis and theta2 is the angle of the
+second link relative to the first.  Both may be arrays of the same shape.
+Returns the positions of the elbow and of the tip as arrays with an extra
+trailing axis of length 2."""
+    theta1 = np.asarray(theta1, dtype=float)
+    theta2 = np.asarray(theta2, dtype=float)
+    (length1, length2) = linkLengths
+
+    elbow = np.stack([ base[0] + length1 * np.cos(theta1),
+                       base[1] + length1 * np.sin(theta1) ], axis=-1)
+    tip = np.stack([ elbow[..., 0] + length2 * np.cos(theta1 + theta2),
+                     elbow[..., 1] + length2 * np.sin(theta1 + theta2) ],
+                   axis=-1)
+
+    return (elbow, tip)
+
+def configurationSpaceKey(linkLengths, obstacles, resolution, base=(0, 0)):
+    """
+Returns a hex digest identifying a configuration space by the robot's
+geometry, the obstacles and the sampling resolution.  The numbers are
+converted to floats first so that [1, 0] and [1.0, 0.0] give the same key."""
+    description = repr(( tuple(float(length) for length in linkLengths),
+                         tuple(float(x) for x in base),
+                         int(resolution),
+                         tuple(tuple((float(x), float(y)) for [x, y] in obstacle)
+                               for obstacle in obstacles) ))
+
+    return hashlib.sha1(description.encode()).hexdigest()
+
+def computeConfigurationSpaceTwoLinkArm(linkLengths, obstacles, resolution=360,
+                                        base=(0, 0), cacheDirectory=None):
+    """
+Rasterizes the obstacles into the configuration space of a two link arm.
+The torus is sampled on a resolution x resolution grid where entry [i, j]
+corresponds to theta1 = 2 pi i / resolution and theta2 = 2 pi j /
+resolution, the same angles measured by
+circleAndTorusDistance.computeDistanceOnTorus().  Returns a uint8 array
+that is 1 where either link collides with an obstacle and 0 where the arm
+is free.
+
+Every configuration is checked at once per link and per obstacle side with
+batchCollisionDetection, so a 360 x 360 space takes on the order of a second
+instead of the hours nested calls to doTwoSegmentsIntersect() would.  If
+cacheDirectory is given, the bitmap is saved there keyed by
+configurationSpaceKey() and loaded instead of recomputed next time.
+
+Raises an AssertionError if resolution is not a positive integer or if
+linkLengths doesn't have two entries."""
+    assert resolution > 0 and resolution == int(resolution), "computeConfigurationSpaceTwoLinkArm: resolution must be a positive integer"
+    assert len(linkLengths) == 2, "computeConfigurationSpaceTwoLinkArm: linkLengths must have two entries"
+
+    cachePath = None
+    if (cacheDirectory is not None):
+        cachePath = os.path.join(
+            cacheDirectory,
+            configurationSpaceKey(linkLengths, obstacles, resolution, base)
+            + ".npy")
+        if (os.path.exists(cachePath)):
+            return np.load(cachePath)
+
+    angles = 2 * math.pi * np.arange(resolution) / resolution
+    (theta1, theta2) = np.meshgrid(angles, angles, indexing="ij")
+    (elbow, tip) = computeTwoLinkArmPositions(theta1.ravel(), theta2.ravel(),
+                                              linkLengths, base)
+    shoulder = np.broadcast_to(np.asarray(base, dtype=float), elbow.shape)
+
+    # the first link only depends on theta1, so it is checked once per row
+    # and spread across the row afterwards
+    firstLinkCollides = batchCollisionDetection.doSegmentsIntersectPolygons(
+        shoulder[::resolution], elbow[::resolution], obstacles)
+    secondLinkCollides = batchCollisionDetection.doSegmentsIntersectPolygons(
+        elbow, tip, obstacles).reshape(resolution, resolution)
+
+    occupancy = (firstLinkCollides[:, np.newaxis] | secondLinkCollides) \
+        .astype(np.uint8)
+
+    if (cachePath is not None):
+        os.makedirs(cacheDirectory, exist_ok=True)
+        temporaryPath = cachePath + ".tmp.npy"
+        np.save(temporaryPath, occupancy)
+        os.replace(temporaryPath, cachePath)
+
+    return occupancy
+
+def computeGridGraph(occupancy, startCell=None, wrap=True):
+    """
+Turns an occupancy bitmap into an adjacency table that
+breadthFirstSearch.computeBFSPath() can search.  Free cells are connected to
+their free 4-neighbors, and with wrap set the grid is treated as a torus so
+the first and last rows and columns are neighbors too.  Returns
+(adjacencyTable, cells) where cells[n] is the (row, column) of node n.
+
+computeBFSTree() needs a connected graph, so if startCell is given only the
+free cells reachable from it are included.
+
+Raises an AssertionError if startCell is given and is occupied."""
+    occupancy = np.asarray(occupancy)
+    (rows, columns) = occupancy.shape
+    free = occupancy == 0
+
+    if (startCell is not None):
+        assert free[startCell], "computeGridGraph: startCell must be free"
+        free = _floodFill(free, startCell, wrap)
+
+    nodeOf = np.full(occupancy.shape, -1, dtype=np.int64)
+    cells = np.argwhere(free)
+    nodeOf[free] = np.arange(len(cells))
+
+    neighborLists = [ ]
+    for (dRow, dColumn) in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        neighborRows = cells[:, 0] + dRow
+        neighborColumns = cells[:, 1] + dColumn
+        if (wrap):
+            neighborRows %= rows
+            neighborColumns %= columns
+            neighbors = nodeOf[neighborRows, neighborColumns]
+        else:
+            inside = (neighborRows >= 0) & (neighborRows < rows) \
+                & (neighborColumns >= 0) & (neighborColumns < columns)
+            neighbors = np.full(len(cells), -1, dtype=np.int64)
+            neighbors[inside] = nodeOf[neighborRows[inside],
+                                       neighborColumns[inside]]
+        neighborLists.append(neighbors.tolist())
+
+    adjacencyTable = [ [ n for n in candidates if n >= 0 ]
+                       for candidates in zip(*neighborLists) ]
+
+    return (adjacencyTable, [ tuple(cell) for cell in cells.tolist() ])
+
+def _floodFill(free, startCell, wrap):
+    reachable = np.zeros(free.shape, dtype=bool)
+    reachable[startCell] = True
+    (rows, columns) = free.shape
+    frontier = [ tuple(startCell) ]
+    while frontier:
+        nextFrontier = [ ]
+        for (row, column) in frontier:
+            for (r, c) in ((row - 1, column), (row + 1, column),
+                           (row, column - 1), (row, column + 1)):
+                if (wrap):
+                    (r, c) = (r % rows, c % columns)
+                elif (r < 0 or r >= rows or c < 0 or c >= columns):
+                    continue
+                if (free[r, c] and not reachable[r, c]):
+                    reachable[r, c] = True
+                    nextFrontier.append((r, c))
+        frontier = nextFrontier
+
+    return reachable
+
+def angleToCell(theta, resolution):
+    """
+Returns the index of the grid sample nearest to the angle theta."""
+    return int(round((theta % (2 * math.pi)) / (2 * math.pi) * resolution)) \
+        % resolution
+
+
+instrumentation.registerModule(__name__)
+
+
+
+if "__main__" == __name__:
+    import time
+
+    import breadthFirstSearch
+
+    linkLengths = [1, 1]
+    obstacles = [ [[1, 0.5], [1.5, 0.5], [1.5, 1], [1, 1]],
+                  [[-1.5, -1.5], [-0.5, -1.5], [-0.5, -1]] ]
+
+    startTime = time.perf_counter()
+    occupancy = computeConfigurationSpaceTwoLinkArm(linkLengths, obstacles, 360)
+    print("computeConfigurationSpaceTwoLinkArm(): %.2f s, %d of %d occupied"
+          % (time.perf_counter() - startTime, occupancy.sum(), occupancy.size))
+
+    start = (angleToCell(0, 360), angleToCell(0, 360))
+    goal = (angleToCell(math.pi / 2, 360), angleToCell(0, 360))
+    (adjacencyTable, cells) = computeGridGraph(occupancy, start)
+    nodeOf = { cell: node for (node, cell) in enumerate(cells) }
+    path = breadthFirstSearch.computeBFSPath(adjacencyTable, nodeOf[start],
+                                             nodeOf[goal])
+    print("computeBFSPath() through the free space: %d cells" % len(path))
@@ -0,0 +1,241 @@
+import math
+
+import instrumentation
+import linesAndSegments
+import polygonDecomposition
+import robustPredicates
+
+
+def placeFootprint(footprint, pose):
+    """
+Returns the vertices of footprint, given relative to the robot's reference
+point, after rotating it by pose[2] radians and moving the reference point
+to (pose[0], pose[1]).  A pose with only two entries isn't rotated."""
+    if (len(pose) < 3 or pose[2] == 0):
+        return [ [ x + pose[0], y + pose[1] ] for [x, y] in footprint ]
+
+    (c, s) = (math.cos(pose[2]), math.sin(pose[2]))
+
+    return [ [ c * x - s * y + pose[0], s * x + c * y + pose[1] ]
+             for [x, y] in footprint ]
+
+def computeConfigurationObstacle(footprint, obstacle):
+    """
+Returns the Minkowski sum of obstacle and the reflected footprint, which is
+the set of positions of the robot's reference point where the footprint
+touches the obstacle.  Both polygons must be convex, so the sum is the
+convex hull of the differences of their vertices, given counter-clockwise."""
+    return polygonDecomposition.computeConvexHull(
+        [ [ o[0] - f[0], o[1] - f[1] ] for o in obstacle for f in footprint ])
+
+def computeTimeOfFirstContact(footprint, start, end, obstacle):
+    """
+Finds the first time the convex footprint, translating with its reference
+point moving from start to end, touches the convex obstacle.  Time is the
+fraction of the motion, so 0 means it is already in contact at start and 1
+means it first touches at end.  Returns None if it never touches.
+
+Instead of placing the footprint at sampled positions, the obstacle is
+grown by the footprint with computeConfigurationObstacle() and the path of
+the reference point is clipped against the grown polygon (Cyrus-Beck
+clipping), so one exact query covers the whole segment."""
+    configurationObstacle = computeConfigurationObstacle(footprint, obstacle)
+    direction = [ end[0] - start[0], end[1] - start[1] ]
+
+    if (len(configurationObstacle) == 1):
+        # both shapes are single points, so only the segment can touch it
+        if (linesAndSegments.computeDistancePointToSegment(
+                configurationObstacle[0], start, end) > 0):
+            return None
+        return _parameterAlongSegment(configurationObstacle[0], start, direction)
+    if (len(configurationObstacle) == 2):
+        # a point and a segment, or two parallel segments, grow into a
+        # segment, which has no inside to clip against
+        return _timeOfFirstContactWithSegment(start, end,
+                                              *configurationObstacle)
+
+    enter = 0.0
+    leave = 1.0
+    for i in range(len(configurationObstacle)):
+        vertex = configurationObstacle[i - 1]
+        nextVertex = configurationObstacle[i]
+        side = [ nextVertex[0] - vertex[0], nextVertex[1] - vertex[1] ]
+        # the inside of a counter-clockwise polygon is on the left of each
+        # side, where distance(t) = startDistance + t * rate >= 0
+        startDistance = side[0] * (start[1] - vertex[1]) \
+            - side[1] * (start[0] - vertex[0])
+        rate = side[0] * direction[1] - side[1] * direction[0]
+
+        if (rate == 0):
+            if (startDistance < 0):
+                return None
+        elif (rate > 0):
+            enter = max(enter, -startDistance / rate)
+        else:
+            leave = min(leave, -startDistance / rate)
+
+        if (enter > leave):
+            return None
+
+    return enter
+
+def _parameterAlongSegment(point, start, direction):
+    lengthSquared = direction[0] ** 2 + direction[1] ** 2
+    if (lengthSquared == 0):
+        return 0.0
+
+    return ((point[0] - start[0]) * direction[0]
+            + (point[1] - start[1]) * direction[1]) / lengthSquared
+
+def _timeOfFirstContactWithSegment(start, end, a, b):
+    if (not robustPredicates.doSegmentsIntersect([ start, end ], [ a, b ])):
+        return None
+
+    direction = [ end[0] - start[0], end[1] - start[1] ]
+    if (robustPredicates.orientation(start, end, a) != 0
+        or robustPredicates.orientation(start, end, b) != 0):
+        # crossing at a single point
+        side = [ b[0] - a[0], b[1] - a[1] ]
+        time = ((a[0] - start[0]) * side[1] - (a[1] - start[1]) * side[0]) \
+            / (direction[0] * side[1] - direction[1] * side[0])
+        return min(max(time, 0.0), 1.0)
+
+    # along the same line, so the path first touches a-b at start or at the
+    # nearer end of a-b
+    if (linesAndSegments.computeDistancePointToSegment(start, a, b) == 0):
+        return 0.0
+
+    return min(max(min(_parameterAlongSegment(a, start, direction),
+                       _parameterAlongSegment(b, start, direction)), 0.0), 1.0)
+
+def computeTimeOfFirstContactWithObstacles(footprint, start, end, obstacles):
+    """
+computeTimeOfFirstContact() against every polygon in obstacles.  Returns
+(time, index) for the obstacle that is touched first, or (None, None) if
+the motion is collision free."""
+    firstTime = None
+    firstObstacle = None
+    for (index, obstacle) in enumerate(obstacles):
+        time = computeTimeOfFirstContact(footprint, start, end, obstacle)
+        if (time is not None and (firstTime is None or time < firstTime)):
+            firstTime = time
+            firstObstacle = index
+
+    return (firstTime, firstObstacle)
+
+def computeTimeOfFirstContactWithPreparedObstacle(footprint, start, end,
+                                                  obstacle):
+    """
+computeTimeOfFirstContact() for a polygonDecomposition.PreparedObstacle,
+which doesn't have to be convex.  The motion is first checked against the
+obstacle's convex hull, which rejects most motions in one query, and only
+then against each convex piece, keeping the earliest contact."""
+    if (computeTimeOfFirstContact(footprint, start, end, obstacle.hull) is None):
+        return None
+
+    (time, _) = computeTimeOfFirstContactWithObstacles(footprint, start, end,
+                                                       obstacle.pieces)
+
+    return time
+
+def _convexPolygonsAreWithin(polygon1, polygon2, distance):
+    # hulls of fewer than three vertices are handled by collisionDetection
+    if (polygonDecomposition.doConvexPolygonsIntersect(polygon1, polygon2)):
+        return True
+
+    for (polygon, other) in ((polygon1, polygon2), (polygon2, polygon1)):
+        for point in polygon:
+            for i in range(len(other)):
+                if (linesAndSegments.computeDistancePointToSegment(
+                        point, other[i - 1], other[i]) <= distance):
+                    return True
+
+    return False
+
+def _sweptHull(footprint, startPose, endPose, t0, t1):
+    """
+A convex polygon and a margin that together contain everything the
+footprint covers between times t0 and t1 of the motion.  Each vertex moves
+along a straight line plus a circular arc, and the arc strays at most
+r (1 - cos(dTheta / 2)) from its chord, so the hull of the footprint at the
+two ends of the interval, grown by that much, contains the whole sweep."""
+    poses = [ [ startPose[k] + t * (endPose[k] - startPose[k]) for k in range(3) ]
+              for t in (t0, t1) ]
+    hull = polygonDecomposition.computeConvexHull(
+        placeFootprint(footprint, poses[0]) + placeFootprint(footprint, poses[1]))
+    radius = max(math.hypot(x, y) for [x, y] in footprint)
+    margin = radius * (1 - math.cos(abs(poses[1][2] - poses[0][2]) / 2))
+
+    return (hull, margin)
+
+def computeTimeOfFirstContactWithRotation(footprint, startPose, endPose,
+                                          obstacle, tolerance=1e-3):
+    """
+Like computeTimeOfFirstContact() for a footprint that also rotates, with
+poses (x, y, theta) interpolated linearly.  The motion is cut into
+intervals and each interval is tested at once with the convex hull swept
+by the footprint over it.  Intervals whose hull is clear of the obstacle
+are done; the others are split in two, earliest first, until they are
+shorter than tolerance.
+
+The answer is conservative: it is never later than the real first contact
+and at most tolerance earlier, but a near miss closer than the swept hull's
+margin over such a short interval may be reported as contact.  Returns None if
+the motion is collision free.  Without rotation this just calls
+computeTimeOfFirstContact(), which is exact."""
+    if (startPose[2] == endPose[2]):
+        return computeTimeOfFirstContact(
+            placeFootprint(footprint, [ 0, 0, startPose[2] ]),
+            startPose[:2], endPose[:2], obstacle)
+
+    obstacleHull = polygonDecomposition.computeConvexHull(obstacle)
+    # start with intervals turning at most pi / 8 so the margins are small
+    pieces = max(1, int(math.ceil(abs(endPose[2] - startPose[2]) / (math.pi / 8))))
+    intervals = [ (i / pieces, (i + 1) / pieces)
+                  for i in reversed(range(pieces)) ]
+
+    while intervals:
+        (t0, t1) = intervals.pop()
+        (hull, margin) = _sweptHull(footprint, startPose, endPose, t0, t1)
+        if (not _convexPolygonsAreWithin(hull, obstacleHull, margin)):
+            continue
+        if (t1 - t0 <= tolerance):
+            return t0
+        middle = (t0 + t1) / 2
+        intervals.append((middle, t1))
+        intervals.append((t0, middle))
+
+    return None
+
+
+instrumentation.registerModule(__name__)
+
+
+
+if "__main__" == __name__:
+    unitSquare = [[0.5, 0.5], [-0.5, 0.5], [-0.5, -0.5], [0.5, -0.5]]
+    wall = [[3, -5], [4, -5], [4, 5], [3, 5]]
+
+    print("computeTimeOfFirstContact()")
+    print(computeTimeOfFirstContact(unitSquare, [0, 0], [5, 0], wall))  # 0.5
+    print(computeTimeOfFirstContact(unitSquare, [0, 0], [0, 5], wall))  # None
+    print(computeTimeOfFirstContact(unitSquare, [3, 0], [5, 0], wall))  # 0.0
+
+    print("\ncomputeTimeOfFirstContactWithObstacles()")
+    print(computeTimeOfFirstContactWithObstacles(
+        unitSquare, [0, 0], [5, 0], [wall, [[1, -1], [2, -1], [1.5, 1]]]))
+    # (0.125, 1)
+
+    uShape = polygonDecomposition.prepareObstacle(
+        [[3, -2], [6, -2], [6, 2], [3, 2], [3, 1], [5, 1], [5, -1], [3, -1]])
+    print(computeTimeOfFirstContactWithPreparedObstacle(unitSquare, [0, 0],
+                                                        [6, 0], uShape))
+    # 0.75, it goes into the U and stops at the bottom
+
+    print("\ncomputeTimeOfFirstContactWithRotation()")
+    print(computeTimeOfFirstContactWithRotation(unitSquare, [0, 0, 0],
+                                                [5, 0, 0], wall))  # 0.5
+    # turning by 45 degrees on the way brings a corner out to 0.707
+    print(computeTimeOfFirstContactWithRotation(unitSquare, [0, 0, 0],
+                                                [5, 0, math.pi / 2], wall))
+    # about 0.46
@@ -0,0 +1,409 @@
+import heapq
+import math
+from collections import deque
+
+import collisionDetection
+import instrumentation
+import polygonDecomposition
+import robustPredicates
+
+
+def doesSegmentCollideWithPolygon(p, q, polygon):
+    """
+Returns True if the segment p-q touches polygon: either it crosses or
+touches one of the polygon's sides, or it is entirely inside it."""
+    for i in range(len(polygon)):
+        if (robustPredicates.doSegmentsIntersect([ p, q ],
+                                                 [ polygon[i - 1], polygon[i] ])):
+            return True
+
+    return collisionDetection.isPointInPolygon(p, polygon)
+
+
+class _SpatialHash:
+    """
+Uniform grid of square cells, each holding the keys of the items whose
+bounding boxes overlap it.  Adding, moving or removing an item only
+touches the cells under its old and new boxes."""
+
+    def __init__(self, cellSize):
+        self.cellSize = cellSize
+        self.cells = { }
+        self.cellsOf = { }
+
+    def _cellsUnder(self, box):
+        (minColumn, minRow) = (int(math.floor(box[0] / self.cellSize)),
+                               int(math.floor(box[1] / self.cellSize)))
+        (maxColumn, maxRow) = (int(math.floor(box[2] / self.cellSize)),
+                               int(math.floor(box[3] / self.cellSize)))
+
+        return [ (column, row) for column in range(minColumn, maxColumn + 1)
+                 for row in range(minRow, maxRow + 1) ]
+
+    def add(self, key, box):
+        cells = self._cellsUnder(box)
+        self.cellsOf[key] = cells
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        for cell in self.cellsOf.pop(key):
+            keys = self.cells[cell]
+            keys.discard(key)
+            if (not keys):
+                del self.cells[cell]
+
+    def query(self, box):
+        found = set()
+        for cell in self._cellsUnder(box):
+            found.update(self.cells.get(cell, ()))
+
+        return found
+
+
+class ObstacleSet:
+    """
+A set of polygonal obstacles that can change while planning, as doors open
+and pallets are moved.  Obstacles are indexed in a uniform grid with cells
+of size cellSize, so collision queries only look at obstacles near the
+query, and inserting, removing or moving an obstacle only updates the grid
+cells under it.
+
+Each obstacle is kept as a polygonDecomposition.PreparedObstacle too, so
+queries go through its bounding box, convex hull and convex pieces.
+Obstacles that aren't simple polygons can't be decomposed and are checked
+side by side instead.
+
+Objects that cache results depending on the obstacles, such as
+DynamicRoadmap, register with addListener() and are told the bounding boxes
+of the regions that changed, so they can repair just those regions."""
+
+    def __init__(self, cellSize=1.0):
+        assert cellSize > 0, "ObstacleSet: cellSize must be positive"
+
+        self.obstacles = { }
+        self.boxes = { }
+        self.prepared = { }
+        self._index = _SpatialHash(cellSize)
+        self._listeners = [ ]
+        self._nextId = 0
+
+    def addListener(self, listener):
+        """
+listener is called with a list of bounding boxes of the changed regions
+after every insert, remove or move."""
+        self._listeners.append(listener)
+
+    def _notify(self, boxes):
+        for listener in self._listeners:
+            listener(boxes)
+
+    def _prepare(self, obstacleId):
+        polygon = self.obstacles[obstacleId]
+        self.prepared[obstacleId] = None
+        if (len(polygon) >= 3 and polygonDecomposition.isSimple(polygon)):
+            self.prepared[obstacleId] = \
+                polygonDecomposition.prepareObstacle(polygon)
+
+    def insert(self, polygon):
+        """
+Adds polygon and returns the id used to remove or move it later.
+
+Raises an AssertionError if polygon isn't a polygon as defined by
+collisionDetection.isPolygon()."""
+        assert collisionDetection.isPolygon(polygon), "ObstacleSet.insert: polygon is not a list of points"
+
+        obstacleId = self._nextId
+        self._nextId = obstacleId + 1
+        self.obstacles[obstacleId] = [ list(vertex) for vertex in polygon ]
+        self.boxes[obstacleId] = polygonDecomposition.computeAABB(polygon)
+        self._prepare(obstacleId)
+        self._index.add(obstacleId, self.boxes[obstacleId])
+        self._notify([ self.boxes[obstacleId] ])
+
+        return obstacleId
+
+    def remove(self, obstacleId):
+        box = self.boxes.pop(obstacleId)
+        del self.obstacles[obstacleId]
+        del self.prepared[obstacleId]
+        self._index.remove(obstacleId)
+        self._notify([ box ])
+
+    def move(self, obstacleId, polygon):
+        """
+Replaces the vertices of an obstacle, for example with the same shape
+somewhere else."""
+        assert collisionDetection.isPolygon(polygon), "ObstacleSet.move: polygon is not a list of points"
+
+        oldBox = self.boxes[obstacleId]
+        self.obstacles[obstacleId] = [ list(vertex) for vertex in polygon ]
+        self.boxes[obstacleId] = polygonDecomposition.computeAABB(polygon)
+        self._prepare(obstacleId)
+        self._index.remove(obstacleId)
+        self._index.add(obstacleId, self.boxes[obstacleId])
+        # the old and new places are reported separately, since the box
+        # around both can be much bigger when an obstacle moves far
+        self._notify([ oldBox, self.boxes[obstacleId] ])
+
+    def translate(self, obstacleId, dx, dy):
+        self.move(obstacleId, [ [ x + dx, y + dy ]
+                                for [x, y] in self.obstacles[obstacleId] ])
+
+    def obstaclesNear(self, box):
+        """
+Returns the ids of the obstacles whose bounding boxes overlap box."""
+        return [ obstacleId for obstacleId in self._index.query(box)
+                 if polygonDecomposition.doAABBsOverlap(self.boxes[obstacleId],
+                                                        box) ]
+
+    def _isPointInObstacle(self, point, obstacleId):
+        prepared = self.prepared[obstacleId]
+        if (prepared is None):
+            return collisionDetection.isPointInPolygon(
+                point, self.obstacles[obstacleId])
+
+        return polygonDecomposition.isPointInPreparedObstacle(point, prepared)
+
+    def _doesSegmentCollideWithObstacle(self, p, q, obstacleId):
+        prepared = self.prepared[obstacleId]
+        if (prepared is None):
+            return doesSegmentCollideWithPolygon(p, q,
+                                                 self.obstacles[obstacleId])
+
+        return polygonDecomposition.doesSegmentIntersectPreparedObstacle(
+            p, q, prepared)
+
+    def isPointFree(self, point):
+        return not any(self._isPointInObstacle(point, obstacleId)
+                       for obstacleId in self.obstaclesNear(
+                           [ point[0], point[1], point[0], point[1] ]))
+
+    def isSegmentFree(self, p, q):
+        return not any(self._doesSegmentCollideWithObstacle(p, q, obstacleId)
+                       for obstacleId in self.obstaclesNear(
+                           polygonDecomposition.computeAABB([ p, q ])))
+
+
+class DynamicRoadmap:
+    """
+A roadmap over points with candidate edges between pairs of them, where an
+edge is usable while it is collision free in obstacleSet.  When the
+obstacles change, only the candidate edges whose bounding boxes overlap the
+changed regions are checked again, found through the same kind of grid index
+the obstacle set uses, and the edges that appeared or disappeared are
+passed on to listeners such as IncrementalBFSTree."""
+
+    def __init__(self, obstacleSet, points, candidateEdges, cellSize=1.0):
+        self.obstacleSet = obstacleSet
+        self.points = [ list(point) for point in points ]
+        self.candidateEdges = [ (min(i, j), max(i, j))
+                                for (i, j) in candidateEdges ]
+        self.adjacency = [ set() for _ in self.points ]
+        self.edgesChecked = 0
+        self._index = _SpatialHash(cellSize)
+        self._listeners = [ ]
+
+        for (edgeIndex, (i, j)) in enumerate(self.candidateEdges):
+            self._index.add(edgeIndex, polygonDecomposition.computeAABB(
+                [ self.points[i], self.points[j] ]))
+            if (obstacleSet.isSegmentFree(self.points[i], self.points[j])):
+                self.adjacency[i].add(j)
+                self.adjacency[j].add(i)
+
+        obstacleSet.addListener(self._obstaclesChanged)
+
+    def addListener(self, listener):
+        """
+listener is called with (removedEdges, addedEdges), two lists of node
+pairs, whenever the usable edges change."""
+        self._listeners.append(listener)
+
+    def neighbors(self, node):
+        return self.adjacency[node]
+
+    def _obstaclesChanged(self, boxes):
+        removed = [ ]
+        added = [ ]
+        edgeIndices = set()
+        for box in boxes:
+            edgeIndices.update(self._index.query(box))
+
+        for edgeIndex in edgeIndices:
+            (i, j) = self.candidateEdges[edgeIndex]
+            edgeBox = polygonDecomposition.computeAABB([ self.points[i],
+                                                          self.points[j] ])
+            if (not any(polygonDecomposition.doAABBsOverlap(edgeBox, box)
+                        for box in boxes)):
+                continue
+            self.edgesChecked = self.edgesChecked + 1
+
+            free = self.obstacleSet.isSegmentFree(self.points[i],
+                                                  self.points[j])
+            if (free and j not in self.adjacency[i]):
+                self.adjacency[i].add(j)
+                self.adjacency[j].add(i)
+                added.append((i, j))
+            elif (not free and j in self.adjacency[i]):
+                self.adjacency[i].discard(j)
+                self.adjacency[j].discard(i)
+                removed.append((i, j))
+
+        if (removed or added):
+            for listener in self._listeners:
+                listener(removed, added)
+
+
+class IncrementalBFSTree:
+    """
+A breadth first search tree of a DynamicRoadmap from startNode that is
+repaired instead of rebuilt when edges change, in the spirit of LPA* and
+D* Lite.  When an edge of the tree disappears, only the nodes below it lose
+their distances; they are reconnected from their neighbors that still have
+one, and the new distances are spread among them in order.  When an edge
+appears, distances are only lowered starting from its ends.  Either way the
+work is proportional to the number of nodes whose distance changes, which
+lastRepairSize reports."""
+
+    def __init__(self, roadmap, startNode):
+        self.roadmap = roadmap
+        self.startNode = startNode
+        self.lastRepairSize = 0
+        self._rebuild()
+        roadmap.addListener(self._edgesChanged)
+
+    def _rebuild(self):
+        count = len(self.roadmap.points)
+        self.distances = [ math.inf ] * count
+        self.parents = [ None ] * count
+        self.children = [ set() for _ in range(count) ]
+        self.distances[self.startNode] = 0
+
+        queue = deque([ self.startNode ])
+        while queue:
+            node = queue.popleft()
+            for neighbor in self.roadmap.neighbors(node):
+                if (self.distances[neighbor] == math.inf):
+                    self._setParent(neighbor, node)
+                    self.distances[neighbor] = self.distances[node] + 1
+                    queue.append(neighbor)
+
+    def _setParent(self, node, parent):
+        if (self.parents[node] is not None):
+            self.children[self.parents[node]].discard(node)
+        self.parents[node] = parent
+        if (parent is not None):
+            self.children[parent].add(node)
+
+    def _edgesChanged(self, removed, added):
+        repaired = set()
+
+        # nodes hanging below a removed tree edge lose their distances
+        orphans = [ ]
+        for (i, j) in removed:
+            for (parent, child) in ((i, j), (j, i)):
+                if (self.parents[child] == parent):
+                    self._setParent(child, None)
+                    orphans.append(child)
+
+        affected = set()
+        stack = list(orphans)
+        while stack:
+            node = stack.pop()
+            if (node in affected):
+                continue
+            affected.add(node)
+            stack.extend(self.children[node])
+        for node in affected:
+            self.distances[node] = math.inf
+            self._setParent(node, None)
+
+        # reconnect them from their neighbors that kept their distances,
+        # then let the new distances spread through the affected nodes
+        heap = [ ]
+        for node in affected:
+            for neighbor in self.roadmap.neighbors(node):
+                if (neighbor not in affected
+                    and self.distances[neighbor] + 1 < self.distances[node]):
+                    self.distances[node] = self.distances[neighbor] + 1
+                    self._setParent(node, neighbor)
+            if (self.distances[node] < math.inf):
+                heapq.heappush(heap, (self.distances[node], node))
+
+        # an added edge can only shorten distances, starting at its ends
+        for (i, j) in added:
+            for (near, far) in ((i, j), (j, i)):
+                if (self.distances[near] + 1 < self.distances[far]):
+                    self.distances[far] = self.distances[near] + 1
+                    self._setParent(far, near)
+                    heapq.heappush(heap, (self.distances[far], far))
+
+        while heap:
+            (distance, node) = heapq.heappop(heap)
+            if (distance > self.distances[node]):
+                continue
+            repaired.add(node)
+            for neighbor in self.roadmap.neighbors(node):
+                if (distance + 1 < self.distances[neighbor]):
+                    self.distances[neighbor] = distance + 1
+                    self._setParent(neighbor, node)
+                    heapq.heappush(heap, (distance + 1, neighbor))
+
+        self.lastRepairSize = len(repaired | affected)
+
+    def pathTo(self, goalNode):
+        """
+Returns the list of nodes from startNode to goalNode, or an empty list if
+goalNode can't be reached."""
+        if (self.distances[goalNode] == math.inf):
+            return [ ]
+
+        path = [ goalNode ]  # this will be reversed at the end
+        while path[-1] != self.startNode:
+            path.append(self.parents[path[-1]])
+        path.reverse()
+
+        return path
+
+
+def gridRoadmap(obstacleSet, rows, columns, spacing=1.0, origin=(0, 0),
+                cellSize=None):
+    """
+Builds a DynamicRoadmap over a rows x columns lattice of points with edges
+between 4-neighbors.  Node r * columns + c is at
+origin + spacing * (c, r)."""
+    points = [ [ origin[0] + spacing * c, origin[1] + spacing * r ]
+               for r in range(rows) for c in range(columns) ]
+    edges = [ (r * columns + c, r * columns + c + 1)
+              for r in range(rows) for c in range(columns - 1) ] \
+        + [ (r * columns + c, (r + 1) * columns + c)
+            for r in range(rows - 1) for c in range(columns) ]
+
+    return DynamicRoadmap(obstacleSet, points, edges,
+                          spacing * 4 if cellSize is None else cellSize)
+
+
+instrumentation.registerModule(__name__)
+
+
+
+if "__main__" == __name__:
+    obstacles = ObstacleSet(cellSize=4)
+    roadmap = gridRoadmap(obstacles, 50, 50)
+    tree = IncrementalBFSTree(roadmap, 0)
+    print("path length with no obstacles: %d" % len(tree.pathTo(49)))  # 50
+
+    door = obstacles.insert([[20.5, -1], [21.5, -1], [21.5, 45.5], [20.5, 45.5]])
+    print("after closing the door: %d, %d edges checked, %d nodes repaired"
+          % (len(tree.pathTo(49)), roadmap.edgesChecked, tree.lastRepairSize))
+    # 142, around the top of the door
+
+    pallet = obstacles.insert([[40.5, 40.5], [42.5, 40.5], [42.5, 42.5],
+                               [40.5, 42.5]])
+    roadmap.edgesChecked = 0
+    obstacles.translate(pallet, -20, -20)
+    print("after moving a pallet: %d edges checked, %d nodes repaired"
+          % (roadmap.edgesChecked, tree.lastRepairSize))
+
+    obstacles.remove(door)
+    print("after opening the door: %d" % len(tree.pathTo(49)))  # 50
@@ -8,7 +8,7 @@ import math
 import random
 from itertools import count, islice
 
-from matplotlib import pyplot
+import instrumentation
 
 def computeGridSukharev(numberOfSamples):
     """
@@ -67,10 +67,16 @@ def computeGridHalton(numberOfSamples, baseX, baseY):
 Creates a list of pairs of halton numbers of bases baseX and baseY of length numberOfSamples."""
     return [ [haltonSequence(i, baseX), haltonSequence(i, baseY)] \
                    for i in range(numberOfSamples) ]
-    
+
+
+instrumentation.registerModule(__name__)
+
 
 
 if "__main__" == __name__:
+    # only the demo plots, so importing grid doesn't pay for matplotlib
+    from matplotlib import pyplot
+
     numberOfSamples = 100
     
     sukharev = computeGridSukharev(numberOfSamples)
@@ -0,0 +1,175 @@
+#
+# instrumentation.py
+#
+# Opt-in call counting and timing for the public functions of the geometry
+# modules.  Set ME179P_INSTRUMENT=1 in the environment, or wrap the code in
+#
+#   with instrumentation.instrumentationEnabled():
+#       ...
+#
+# and read the numbers back with getSnapshot() or formatReport().
+#
+
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+import types
+
+ENVIRONMENT_VARIABLE = "ME179P_INSTRUMENT"
+
+_lock = threading.Lock()
+_registeredModules = [ ]
+# qualified name -> [ calls, total seconds ]
+_counters = { }
+# (module, attribute name) -> original function, while enabled
+_originals = { }
+_enabled = False
+_contextDepth = 0
+
+
+def _publicFunctions(module):
+    return [ (name, value) for (name, value) in vars(module).items()
+             if not name.startswith("_")
+             and isinstance(value, types.FunctionType)
+             and value.__module__ == module.__name__ ]
+
+def _wrap(qualifiedName, function):
+    counter = _counters.setdefault(qualifiedName, [ 0, 0.0 ])
+    perfCounter = time.perf_counter
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = perfCounter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = perfCounter() - start
+            with _lock:
+                counter[0] += 1
+                counter[1] += elapsed
+
+    return wrapper
+
+def _instrumentModule(module):
+    for (name, function) in _publicFunctions(module):
+        _originals[(module, name)] = function
+        setattr(module, name, _wrap(module.__name__ + "." + name, function))
+
+def registerModule(moduleName):
+    """
+Called at the bottom of each geometry module so that its public functions
+can be instrumented.  Nothing is wrapped unless instrumentation is enabled,
+so a registered module runs exactly as fast as an unregistered one until
+then."""
+    module = sys.modules[moduleName]
+    with _lock:
+        if (module in _registeredModules):
+            return
+        _registeredModules.append(module)
+    if (_enabled):
+        _instrumentModule(module)
+
+def enableInstrumentation():
+    """
+Replaces every public function of the registered modules with a wrapper
+that counts its calls and adds up its wall time.  The wrappers are put in
+the modules themselves, so calls made from inside a module, such as
+isPointInPolygon() calling doTwoSegmentsIntersect(), are counted too.
+Times are inclusive: a function's time includes the functions it calls."""
+    global _enabled
+    if (_enabled):
+        return
+    _enabled = True
+    for module in list(_registeredModules):
+        _instrumentModule(module)
+
+def disableInstrumentation():
+    """
+Puts the original functions back.  The counters are kept until
+resetCounters()."""
+    global _enabled
+    _enabled = False
+    for ((module, name), function) in list(_originals.items()):
+        setattr(module, name, function)
+    _originals.clear()
+
+def isInstrumentationEnabled():
+    return _enabled
+
+@contextlib.contextmanager
+def instrumentationEnabled():
+    """
+Enables instrumentation for the duration of a with block.  Nested blocks
+are fine, and if it was already on when the outermost block started, it is
+left on afterwards."""
+    global _contextDepth
+    wasEnabled = _enabled
+    _contextDepth = _contextDepth + 1
+    enableInstrumentation()
+    try:
+        yield
+    finally:
+        _contextDepth = _contextDepth - 1
+        if (_contextDepth == 0 and not wasEnabled):
+            disableInstrumentation()
+
+def resetCounters():
+    with _lock:
+        for counter in _counters.values():
+            counter[0] = 0
+            counter[1] = 0.0
+
+def getSnapshot():
+    """
+Returns a JSON serializable dictionary mapping "module.function" to its
+number of calls, total seconds and mean seconds per call, for every
+function that has been called while instrumented."""
+    with _lock:
+        counters = [ (name, calls, seconds)
+                     for (name, (calls, seconds)) in _counters.items()
+                     if calls > 0 ]
+
+    return { name: { "calls": calls,
+                     "totalSeconds": seconds,
+                     "meanSeconds": seconds / calls }
+             for (name, calls, seconds) in counters }
+
+def formatReport(snapshot=None):
+    """
+Returns the snapshot as a table sorted by total time."""
+    if (snapshot is None):
+        snapshot = getSnapshot()
+
+    lines = [ "%-55s %10s %12s %12s" % ("function", "calls", "total s",
+                                         "mean us") ]
+    for (name, numbers) in sorted(snapshot.items(),
+                                  key=lambda item: -item[1]["totalSeconds"]):
+        lines.append("%-55s %10d %12.6f %12.3f"
+                     % (name, numbers["calls"], numbers["totalSeconds"],
+                        1e6 * numbers["meanSeconds"]))
+
+    return "\n".join(lines)
+
+
+if os.environ.get(ENVIRONMENT_VARIABLE, "") not in ("", "0"):
+    enableInstrumentation()
+
+
+
+if "__main__" == __name__:
+    # run as a script this file is __main__, so go through the module that
+    # the geometry modules registered with
+    import bug1
+    import collisionDetection
+    import instrumentation
+
+    with instrumentation.instrumentationEnabled():
+        bug1.computeBug1([0, 0], [5, 3], [ [[1, 2], [1, 0], [3, 0]],
+                                           [[2, 3], [4, 1], [5, 2]] ], 0.1)
+        collisionDetection.doTwoConvexPolygonsIntersect(
+            [[1, 1], [1, -1], [-1, -1], [-1, 1]], [[0, 0], [2, 0], [2, 2]])
+
+    print(instrumentation.formatReport())
@@ -1,5 +1,7 @@
 import math
 
+import instrumentation
+
 def computeLineThroughTwoPoints(p1, p2):
     """
 This function returns coefficiant (a, b, c) such that a*x + b*y + c = 0 
@@ -71,6 +73,9 @@ formula to get the minimum distance between q and the segment."""
         return math.sqrt((p1[0] - q[0]) ** 2 + (p1[1] - q[1]) ** 2)
 
 
+instrumentation.registerModule(__name__)
+
+
 
 if '__main__' == __name__:
     # unit testing computeLineThroughTwoPoints()
@@ -0,0 +1,223 @@
+import math
+
+import numpy as np
+
+
+class OccupancyGrid:
+    """
+A rows x columns occupancy map stored one bit per cell, so a 10000 x 10000
+map takes about 12 MB.  Cell (row, column) covers the square whose lower
+left corner is origin + resolution * (column, row), so rows go along y and
+columns along x.  Cells are occupied when their center is inside an
+obstacle that has been rasterized into the grid.
+
+The bits are kept in a rows x ceil(columns / 8) uint8 array with the
+lowest bit of each byte being the leftmost cell, matching
+numpy.packbits(..., bitorder="little")."""
+
+    def __init__(self, rows, columns, resolution=1.0, origin=(0, 0)):
+        assert rows > 0 and columns > 0, "OccupancyGrid: rows and columns must be positive"
+        assert resolution > 0, "OccupancyGrid: resolution must be positive"
+
+        self.rows = int(rows)
+        self.columns = int(columns)
+        self.resolution = float(resolution)
+        self.origin = (float(origin[0]), float(origin[1]))
+        self.bits = np.zeros((self.rows, (self.columns + 7) // 8),
+                             dtype=np.uint8)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def isInside(self, cell):
+        return 0 <= cell[0] < self.rows and 0 <= cell[1] < self.columns
+
+    def isOccupied(self, cell):
+        """
+Returns True if cell is occupied.  Cells outside the grid count as
+occupied so that searches stay on the map."""
+        (row, column) = cell
+        if (not (0 <= row < self.rows and 0 <= column < self.columns)):
+            return True
+
+        return bool((self.bits[row, column >> 3] >> (column & 7)) & 1)
+
+    def setOccupied(self, cell, occupied=True):
+        (row, column) = cell
+        assert self.isInside(cell), "setOccupied: cell is outside of the grid"
+
+        if (occupied):
+            self.bits[row, column >> 3] |= np.uint8(1 << (column & 7))
+        else:
+            self.bits[row, column >> 3] &= np.uint8(~(1 << (column & 7)) & 0xff)
+
+    def cellOfPoint(self, point):
+        return (int(math.floor((point[1] - self.origin[1]) / self.resolution)),
+                int(math.floor((point[0] - self.origin[0]) / self.resolution)))
+
+    def pointOfCell(self, cell):
+        """
+Returns the center of cell in world coordinates."""
+        return [ self.origin[0] + (cell[1] + 0.5) * self.resolution,
+                 self.origin[1] + (cell[0] + 0.5) * self.resolution ]
+
+    def _unpackRows(self, firstRow, lastRow):
+        return np.unpackbits(self.bits[firstRow:lastRow], axis=1,
+                             count=self.columns, bitorder="little")
+
+    def _packRows(self, firstRow, unpacked):
+        self.bits[firstRow:firstRow + len(unpacked)] = \
+            np.packbits(unpacked, axis=1, bitorder="little")
+
+    def toArray(self):
+        """
+Returns the whole grid as a rows x columns uint8 array of zeros and ones.
+This takes eight times the memory of the grid itself."""
+        return self._unpackRows(0, self.rows)
+
+    def rasterizePolygon(self, polygon):
+        """
+Marks every cell whose center is inside polygon as occupied.  Each row of
+cell centers is intersected with all of the polygon's sides at once and the
+cells between pairs of crossings are filled, which is the even-odd rule, so
+this works for non-convex polygons too."""
+        vertices = np.asarray(polygon, dtype=float)
+        starts = vertices
+        ends = np.roll(vertices, -1, axis=0)
+        nonHorizontal = starts[:, 1] != ends[:, 1]
+        starts = starts[nonHorizontal]
+        ends = ends[nonHorizontal]
+
+        (minimumRow, _) = self.cellOfPoint([0, vertices[:, 1].min()])
+        (maximumRow, _) = self.cellOfPoint([0, vertices[:, 1].max()])
+        firstRow = max(minimumRow, 0)
+        lastRow = min(maximumRow + 1, self.rows)
+        if (firstRow >= lastRow or len(starts) == 0):
+            return
+
+        unpacked = self._unpackRows(firstRow, lastRow)
+        for row in range(firstRow, lastRow):
+            y = self.origin[1] + (row + 0.5) * self.resolution
+            straddles = (starts[:, 1] > y) != (ends[:, 1] > y)
+            crossings = np.sort(
+                starts[straddles, 0] + (y - starts[straddles, 1])
+                * (ends[straddles, 0] - starts[straddles, 0])
+                / (ends[straddles, 1] - starts[straddles, 1]))
+            # columns whose centers lie in [left, right)
+            columns = np.ceil((crossings - self.origin[0]) / self.resolution
+                              - 0.5).astype(np.int64)
+            columns = np.clip(columns, 0, self.columns)
+            for (left, right) in zip(columns[0::2], columns[1::2]):
+                unpacked[row - firstRow, left:right] = 1
+        self._packRows(firstRow, unpacked)
+
+    def rasterizePolygons(self, polygons):
+        for polygon in polygons:
+            self.rasterizePolygon(polygon)
+
+    def dilate(self, radius, bandSize=256):
+        """
+Grows every occupied region by radius (in world units) so that a disk
+shaped robot of that radius can be planned for as a point.  A cell becomes
+occupied if an occupied cell's center is within radius of its center.
+
+The grid is processed bandSize rows at a time, so only a band and the rows
+around it are ever unpacked to one byte per cell."""
+        # the small tolerances keep e.g. 0.3 / 0.05 from rounding down to 5
+        cellRadius = radius / self.resolution
+        reach = int(math.floor(cellRadius + 1e-9))
+        if (reach <= 0):
+            return
+
+        # the half widths come from the real radius, not the rounded reach,
+        # or a fractional radius would leave out cells that are in range
+        halfWidths = [ int(math.floor(
+                           math.sqrt(max(cellRadius ** 2 - dy ** 2, 0)) + 1e-9))
+                       for dy in range(-reach, reach + 1) ]
+        dilated = np.empty_like(self.bits)
+
+        for firstRow in range(0, self.rows, bandSize):
+            lastRow = min(firstRow + bandSize, self.rows)
+            paddedFirst = max(firstRow - reach, 0)
+            paddedLast = min(lastRow + reach, self.rows)
+            source = self._unpackRows(paddedFirst, paddedLast).astype(bool)
+
+            # dilate each source row sideways by every half width that is
+            # needed, then OR the shifted rows together
+            horizontal = { }
+            for halfWidth in set(halfWidths):
+                grown = source.copy()
+                for dx in range(1, halfWidth + 1):
+                    grown[:, dx:] |= source[:, :-dx]
+                    grown[:, :-dx] |= source[:, dx:]
+                horizontal[halfWidth] = grown
+
+            band = np.zeros((lastRow - firstRow, self.columns), dtype=bool)
+            for (dy, halfWidth) in zip(range(-reach, reach + 1), halfWidths):
+                sourceFirst = max(firstRow + dy, paddedFirst)
+                sourceLast = min(lastRow + dy, paddedLast)
+                if (sourceFirst >= sourceLast):
+                    continue
+                band[sourceFirst - dy - firstRow:sourceLast - dy - firstRow] |= \
+                    horizontal[halfWidth][sourceFirst - paddedFirst:
+                                          sourceLast - paddedFirst]
+
+            dilated[firstRow:lastRow] = np.packbits(band, axis=1,
+                                                    bitorder="little")
+
+        self.bits = dilated
+
+    def neighbors(self, cell, connectivity=4):
+        """
+Yields the free cells next to cell.  With connectivity 8 the diagonal
+cells are included too, but only when both of the cells the diagonal step
+passes between are free, so paths don't cut corners of obstacles."""
+        assert connectivity in (4, 8), "neighbors: connectivity must be 4 or 8"
+        (row, column) = cell
+
+        for (r, c) in ((row - 1, column), (row + 1, column),
+                       (row, column - 1), (row, column + 1)):
+            if (not self.isOccupied((r, c))):
+                yield (r, c)
+
+        if (connectivity == 8):
+            for (dr, dc) in ((-1, -1), (-1, 1), (1, -1), (1, 1)):
+                if (not self.isOccupied((row + dr, column + dc))
+                    and not self.isOccupied((row + dr, column))
+                    and not self.isOccupied((row, column + dc))):
+                    yield (row + dr, column + dc)
+
+    def neighborFunction(self, connectivity=4):
+        """
+Returns a function of one cell suitable for
+breadthFirstSearch.computeBFSPathFromNeighbors(), so a grid can be searched
+without building an adjacency table."""
+        return lambda cell: self.neighbors(cell, connectivity)
+
+
+
+if "__main__" == __name__:
+    import breadthFirstSearch
+
+    print("OccupancyGrid")
+    grid = OccupancyGrid(10, 10, 0.1)
+    grid.rasterizePolygon([[0.25, 0.25], [0.25, 0.75], [0.75, 0.75],
+                           [0.75, 0.25]])
+    print(grid.toArray())
+    grid.dilate(0.1)
+    print(grid.toArray())
+
+    # a fractional radius reaches the diagonal cells 0.141 away
+    single = OccupancyGrid(5, 5, 0.1)
+    single.setOccupied((2, 2))
+    single.dilate(0.15)
+    print(single.toArray())  # a 3 x 3 block in the middle
+
+    path = breadthFirstSearch.computeBFSPathFromNeighbors(
+        grid.neighborFunction(8), grid.cellOfPoint([0.05, 0.05]),
+        grid.cellOfPoint([0.95, 0.95]))
+    print(path)
+
+    bigGrid = OccupancyGrid(10000, 10000)
+    print("10000 x 10000 grid: %.1f MB" % (bigGrid.nbytes / 1e6))  # 12.5 MB
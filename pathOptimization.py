@@ -0,0 +1,219 @@
+import math
+import random
+
+import numpy as np
+
+import batchCollisionDetection
+import instrumentation
+
+
+def _asPointList(path):
+    return [ [ point[0], point[1] ] for point in path ]
+
+def nodesToCoordinates(nodePath, coordinates):
+    """
+Turns a path of graph nodes, such as the one breadthFirstSearch.computeBFSPath()
+returns, into a path of points.  coordinates is either a list with the point
+of every node, or a function from a node to its point, such as
+occupancyGrid.OccupancyGrid.pointOfCell."""
+    if (callable(coordinates)):
+        return _asPointList(coordinates(node) for node in nodePath)
+
+    return _asPointList(coordinates[node] for node in nodePath)
+
+def computePathLength(path):
+    return sum(math.hypot(path[i][0] - path[i - 1][0],
+                          path[i][1] - path[i - 1][1])
+               for i in range(1, len(path)))
+
+def areSegmentsFree(starts, ends, obstacles):
+    """
+Returns a boolean array that is True for every segment that neither touches
+nor lies inside any of the obstacles."""
+    if (len(obstacles) == 0):
+        return np.ones(len(starts), dtype=bool)
+
+    return ~batchCollisionDetection.doSegmentsIntersectPolygons(starts, ends,
+                                                                obstacles)
+
+def shortcutPathGreedy(path, obstacles, lookahead=512):
+    """
+Walks along path and from each point it keeps, jumps to the furthest later
+point that can be reached in a straight line without hitting an obstacle.
+All the candidate jumps from a point are checked in one batched call, and
+only the next lookahead points are considered, which bounds the work per
+point on long paths such as Bug1's.  The first and last points are always
+kept, and every step that is kept is either a checked shortcut or a step of
+the original path."""
+    points = np.asarray(path, dtype=float).reshape(-1, 2)
+    if (len(points) <= 2):
+        return _asPointList(path)
+
+    kept = [ 0 ]
+    i = 0
+    while (i < len(points) - 1):
+        candidates = np.arange(i + 2, min(len(points), i + 1 + lookahead))
+        j = i + 1
+        if (len(candidates) > 0):
+            free = areSegmentsFree(np.broadcast_to(points[i],
+                                                   (len(candidates), 2)),
+                                   points[candidates], obstacles)
+            if (free.any()):
+                j = int(candidates[free][-1])
+        kept.append(j)
+        i = j
+
+    return [ [ path[k][0], path[k][1] ] for k in kept ]
+
+def shortcutPathRandom(path, obstacles, iterations=20, batchSize=64,
+                       seed=None):
+    """
+Random shortcutting.  Each iteration picks batchSize random pairs of points
+on the path, checks all their shortcuts in one batched call, and applies the
+free ones that save the most points without overlapping each other.  It
+does well after shortcutPathGreedy(), which can miss shortcuts that start
+from points it skipped."""
+    generator = random.Random(seed)
+    points = _asPointList(path)
+
+    for _ in range(iterations):
+        if (len(points) <= 2):
+            break
+
+        pairs = set()
+        for _ in range(batchSize):
+            i = generator.randrange(len(points) - 2)
+            pairs.add((i, generator.randrange(i + 2, len(points))))
+        pairs = sorted(pairs, key=lambda pair: pair[0] - pair[1])
+
+        array = np.asarray(points, dtype=float)
+        free = areSegmentsFree(array[[ i for (i, _) in pairs ]],
+                               array[[ j for (_, j) in pairs ]], obstacles)
+
+        removed = set()
+        chosen = [ ]
+        for ((i, j), isFree) in zip(pairs, free):
+            if (isFree and all(j <= a or b <= i for (a, b) in chosen)):
+                chosen.append((i, j))
+                removed.update(range(i + 1, j))
+        points = [ point for (k, point) in enumerate(points)
+                   if k not in removed ]
+
+    return points
+
+def smoothPath(path, obstacles, iterations=2, minimumTurn=0.05):
+    """
+Chaikin corner cutting.  Every corner that turns by more than minimumTurn
+radians is replaced by the chord between the points a quarter of the way
+along its two sides, but only if that chord is free; the rest of each side
+is part of the old path, so the result never hits an obstacle that the
+input didn't.  Each iteration checks all its chords in one batched call."""
+    points = _asPointList(path)
+
+    for _ in range(iterations):
+        if (len(points) <= 2):
+            break
+
+        array = np.asarray(points, dtype=float)
+        (previous, corner, following) = (array[:-2], array[1:-1], array[2:])
+        before = corner - previous
+        after = following - corner
+        turn = np.abs(np.arctan2(before[:, 0] * after[:, 1]
+                                 - before[:, 1] * after[:, 0],
+                                 (before * after).sum(axis=1)))
+        cutStarts = 0.75 * corner + 0.25 * previous
+        cutEnds = 0.75 * corner + 0.25 * following
+        cut = (turn > minimumTurn) & areSegmentsFree(cutStarts, cutEnds,
+                                                     obstacles)
+        if (not cut.any()):
+            break
+
+        smoothed = [ points[0] ]
+        for k in range(len(corner)):
+            if (cut[k]):
+                smoothed.append(cutStarts[k].tolist())
+                smoothed.append(cutEnds[k].tolist())
+            else:
+                smoothed.append(points[k + 1])
+        smoothed.append(points[-1])
+        points = smoothed
+
+    return points
+
+def resamplePath(path, maximumSpacing):
+    """
+Splits every step of path into equal pieces no longer than maximumSpacing,
+for controllers that want evenly spaced waypoints.  The original points are
+all kept, so the resampled path follows exactly the same line."""
+    assert maximumSpacing > 0, "resamplePath: maximumSpacing must be positive"
+
+    points = _asPointList(path)
+    if (len(points) <= 1):
+        return points
+
+    resampled = [ points[0] ]
+    for (start, end) in zip(points[:-1], points[1:]):
+        pieces = max(1, math.ceil(math.hypot(end[0] - start[0],
+                                             end[1] - start[1])
+                                  / maximumSpacing))
+        for k in range(1, pieces):
+            resampled.append([ start[0] + (end[0] - start[0]) * k / pieces,
+                               start[1] + (end[1] - start[1]) * k / pieces ])
+        resampled.append(end)
+
+    return resampled
+
+def computePathReport(original, optimized):
+    return { "originalPoints": len(original),
+             "optimizedPoints": len(optimized),
+             "compressionRatio": len(original) / len(optimized)
+                                 if len(optimized) > 0 else 0.0,
+             "originalLength": computePathLength(original),
+             "optimizedLength": computePathLength(optimized) }
+
+def optimizePath(path, obstacles, randomIterations=0, smoothingIterations=0,
+                 maximumSpacing=None, lookahead=512, seed=None):
+    """
+Shortcuts path greedily, then optionally with randomIterations rounds of
+random shortcutting, smoothing and resampling to maximumSpacing.  Returns
+the new path and a computePathReport() dictionary with its compression
+ratio, the number of points before divided by the number after."""
+    optimized = shortcutPathGreedy(path, obstacles, lookahead)
+    if (randomIterations > 0):
+        optimized = shortcutPathRandom(optimized, obstacles, randomIterations,
+                                       seed=seed)
+    if (smoothingIterations > 0):
+        optimized = smoothPath(optimized, obstacles, smoothingIterations)
+    if (maximumSpacing is not None):
+        optimized = resamplePath(optimized, maximumSpacing)
+
+    return (optimized, computePathReport(path, optimized))
+
+
+instrumentation.registerModule(__name__)
+
+
+
+if "__main__" == __name__:
+    import breadthFirstSearch
+    import bug1
+    import occupancyGrid
+
+    obstacles = [ [[1, 2], [1, 0], [3, 0]], [[2, 3], [4, 1], [5, 2]] ]
+
+    print("optimizePath() on a Bug1 path")
+    path = bug1.computeBug1([0, 0], [5, 3], obstacles, 0.01)
+    (optimized, report) = optimizePath(path, obstacles, randomIterations=10,
+                                       smoothingIterations=2, seed=0)
+    print(report)
+
+    print("\noptimizePath() on a BFS path through an occupancy grid")
+    grid = occupancyGrid.OccupancyGrid(60, 60, resolution=0.1)
+    grid.rasterizePolygons(obstacles)
+    nodePath = breadthFirstSearch.computeBFSPathFromNeighbors(
+        grid.neighborFunction(), grid.cellOfPoint([0, 0.5]),
+        grid.cellOfPoint([5, 3]))
+    path = nodesToCoordinates(nodePath, grid.pointOfCell)
+    (optimized, report) = optimizePath(path, obstacles)
+    print(report)
+    print(optimized)
@@ -0,0 +1,373 @@
+#
+# planningService.py
+#
+# A local planning and collision checking service speaking JSON lines over
+# stdin/stdout or a Unix socket.  Each request is one JSON object per line
+# with an "id" and a "type", and each response is one line with the same
+# "id" and either a "result" or an "error":
+#
+#   {"id": 1, "type": "bfsPath", "adjacencyTable": [[1], [0]], "start": 0, "goal": 1}
+#   {"id": 2, "type": "bug1", "start": [0, 0], "goal": [1, 1], "obstacles": [], "stepSize": 0.1}
+#   {"id": 3, "type": "segmentsCollide", "segments": [[[0, 0], [1, 1]]], "obstacles": [...]}
+#   {"id": 4, "type": "pointsInObstacles", "points": [[0.5, 0.5]], "obstacles": [...]}
+#   {"id": 5, "type": "stats"}
+#
+# Requests that arrive within a short window of each other are handled as
+# one batch on a worker, and collision requests against the same obstacles
+# are merged into a single call to the vectorized kernels in
+# batchCollisionDetection, so throughput grows with the batch size rather
+# than being limited by the cost per call.  Responses can come back in a
+# different order than the requests.
+#
+#   python planningService.py                      # stdin/stdout
+#   python planningService.py --socket /tmp/planner.sock
+#
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+import batchCollisionDetection
+import breadthFirstSearch
+import bug1
+import instrumentation
+
+BATCHED_TYPES = ( "bfsPath", "bug1", "segmentsCollide", "pointsInObstacles" )
+
+
+def _obstaclesKey(request):
+    return json.dumps(request["obstacles"], sort_keys=True)
+
+def _parseCollisionRequest(request):
+    """
+Returns the segments of a segmentsCollide request as an N x 2 x 2 array, or
+the points of a pointsInObstacles request as an N x 2 array.  Raises a
+ValueError if they don't have that shape."""
+    if (request["type"] == "segmentsCollide"):
+        (name, shape) = ("segments", (2, 2))
+    else:
+        (name, shape) = ("points", (2,))
+
+    rows = np.asarray(request[name], dtype=float)
+    if (rows.size == 0):
+        return rows.reshape((0,) + shape)
+    if (rows.shape[1:] != shape):
+        raise ValueError("%s must be a list of %s"
+                         % (name, "[[x, y], [x, y]] segments"
+                                  if name == "segments" else "[x, y] points"))
+
+    return rows
+
+def _processCollisionGroup(requestType, obstacles, arrays):
+    """
+Answers collision requests of one type that all share the same obstacles
+with one vectorized call, given their parsed arrays, then splits the
+answer back up into one list per request."""
+    rows = np.concatenate(arrays)
+    if (requestType == "segmentsCollide"):
+        answers = batchCollisionDetection.doSegmentsIntersectPolygons(
+            rows[:, 0], rows[:, 1], obstacles)
+    else:
+        answers = np.zeros(len(rows), dtype=bool)
+        for obstacle in obstacles:
+            answers |= batchCollisionDetection.arePointsInPolygon(rows,
+                                                                  obstacle)
+
+    answers = answers.tolist()
+    results = [ ]
+    start = 0
+    for array in arrays:
+        results.append(answers[start:start + len(array)])
+        start = start + len(array)
+
+    return results
+
+def _describeError(error):
+    return { "error": "%s: %s" % (type(error).__name__, error) }
+
+def processRequests(requests):
+    """
+Handles a batch of requests and returns one response body per request, in
+the same order.  This is what runs on the workers, so it is a plain
+function of plain data that a process pool can call too.
+
+A malformed request only gets an error for itself.  Collision requests are
+checked before they are merged, and if the merged call still fails, its
+requests are answered one at a time."""
+    responses = [ None ] * len(requests)
+
+    groups = { }
+    for (index, request) in enumerate(requests):
+        try:
+            requestType = request["type"]
+            if (requestType == "bfsPath"):
+                path = breadthFirstSearch.computeBFSPath(
+                    request["adjacencyTable"], request["start"], request["goal"])
+                responses[index] = { "result": path }
+            elif (requestType == "bug1"):
+                path = bug1.computeBug1(request["start"], request["goal"],
+                                        request["obstacles"], request["stepSize"])
+                responses[index] = { "result": path }
+            elif (requestType in ("segmentsCollide", "pointsInObstacles")):
+                key = (requestType, _obstaclesKey(request))
+                groups.setdefault(key, [ ]).append(
+                    (index, _parseCollisionRequest(request)))
+            else:
+                responses[index] = { "error": "unknown request type %r"
+                                              % (requestType,) }
+        except Exception as error:
+            responses[index] = _describeError(error)
+
+    for ((requestType, _), members) in groups.items():
+        obstacles = requests[members[0][0]]["obstacles"]
+        try:
+            results = _processCollisionGroup(
+                requestType, obstacles, [ array for (_, array) in members ])
+            for ((index, _), result) in zip(members, results):
+                responses[index] = { "result": result }
+        except Exception:
+            for (index, array) in members:
+                try:
+                    (result,) = _processCollisionGroup(requestType, obstacles,
+                                                       [ array ])
+                    responses[index] = { "result": result }
+                except Exception as error:
+                    responses[index] = _describeError(error)
+
+    return responses
+
+
+class PlanningService:
+    """
+Collects requests into micro-batches and runs each batch on an executor.
+A batch is closed windowSeconds after its first request arrives or once it
+has maxBatchSize requests, whichever comes first, and at most
+maxConcurrentBatches batches run at the same time.  The latencies of the
+last latencyHistory requests, from arrival to answer, are kept for
+getStatistics()."""
+
+    def __init__(self, executor=None, windowSeconds=0.002, maxBatchSize=256,
+                 maxConcurrentBatches=4, latencyHistory=10000):
+        self.executor = executor
+        self.windowSeconds = windowSeconds
+        self.maxBatchSize = maxBatchSize
+        self.maxConcurrentBatches = maxConcurrentBatches
+        self.latencies = deque(maxlen=latencyHistory)
+        self.requestsHandled = 0
+        self.batchesRun = 0
+        self.inFlight = 0
+        self._queue = None
+        self._batcher = None
+        self._slots = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.maxConcurrentBatches)
+        self._batcher = asyncio.ensure_future(self._collectBatches())
+
+    async def stop(self):
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+
+    async def handle(self, request):
+        """
+Answers one request, which is a dictionary parsed from a request line.
+Returns the response dictionary."""
+        if (request.get("type") == "stats"):
+            return { "id": request.get("id"), "result": self.getStatistics() }
+
+        if (request.get("type") not in BATCHED_TYPES):
+            return { "id": request.get("id"),
+                     "error": "unknown request type %r" % (request.get("type"),) }
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((request, future, time.perf_counter()))
+        response = await future
+
+        return dict(response, id=request.get("id"))
+
+    async def _collectBatches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [ await self._queue.get() ]
+            deadline = loop.time() + self.windowSeconds
+            while (len(batch) < self.maxBatchSize):
+                timeout = deadline - loop.time()
+                if (timeout <= 0):
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(),
+                                                        timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._slots.acquire()
+            asyncio.ensure_future(self._runBatch(batch))
+
+    async def _runBatch(self, batch):
+        self.inFlight = self.inFlight + len(batch)
+        try:
+            responses = await asyncio.get_running_loop().run_in_executor(
+                self.executor, processRequests,
+                [ request for (request, _, _) in batch ])
+        except Exception as error:
+            responses = [ _describeError(error) ] * len(batch)
+        finally:
+            self.inFlight = self.inFlight - len(batch)
+            self._slots.release()
+
+        now = time.perf_counter()
+        for ((_, future, arrival), response) in zip(batch, responses):
+            self.latencies.append(now - arrival)
+            if (not future.done()):
+                future.set_result(response)
+        self.requestsHandled = self.requestsHandled + len(batch)
+        self.batchesRun = self.batchesRun + 1
+
+    def getStatistics(self):
+        """
+Returns the queue depth (requests waiting for a batch), the number of
+requests being worked on, batch counts, and the 50th, 90th and 99th
+percentile latencies in milliseconds."""
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            if (not latencies):
+                return None
+            return 1000 * latencies[min(len(latencies) - 1,
+                                        int(fraction * len(latencies)))]
+
+        return { "queueDepth": self._queue.qsize() if self._queue else 0,
+                 "inFlight": self.inFlight,
+                 "requestsHandled": self.requestsHandled,
+                 "batchesRun": self.batchesRun,
+                 "meanBatchSize": self.requestsHandled / self.batchesRun
+                                  if self.batchesRun else 0.0,
+                 "latencyMs": { "p50": percentile(0.50),
+                                "p90": percentile(0.90),
+                                "p99": percentile(0.99) } }
+
+
+async def _answerLine(service, line, write):
+    try:
+        request = json.loads(line)
+        if (not isinstance(request, dict)):
+            raise ValueError("a request must be a JSON object")
+    except ValueError as error:
+        write({ "id": None, "error": "bad request: %s" % error })
+        return
+
+    write(await service.handle(request))
+
+async def serveStdio(service):
+    """
+Reads requests from stdin and writes responses to stdout until stdin is
+closed.  The planning functions print warnings to stdout, so while serving,
+sys.stdout is pointed at stderr to keep them out of the responses."""
+    loop = asyncio.get_running_loop()
+    responses = sys.stdout
+    sys.stdout = sys.stderr
+
+    try:
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader),
+                                     sys.stdin)
+
+        def write(response):
+            responses.write(json.dumps(response) + "\n")
+            responses.flush()
+
+        pending = set()
+        while True:
+            line = await reader.readline()
+            if (not line):
+                break
+            if (line.strip()):
+                task = asyncio.ensure_future(_answerLine(service, line, write))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+        if (pending):
+            await asyncio.wait(pending)
+    finally:
+        sys.stdout = responses
+
+async def serveUnixSocket(service, path):
+    """
+Accepts any number of connections on the Unix socket at path, each
+speaking the same JSON lines protocol as serveStdio()."""
+    async def connection(reader, writer):
+        def write(response):
+            writer.write((json.dumps(response) + "\n").encode())
+
+        pending = set()
+        while True:
+            line = await reader.readline()
+            if (not line):
+                break
+            if (line.strip()):
+                task = asyncio.ensure_future(_answerLine(service, line, write))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        if (pending):
+            await asyncio.wait(pending)
+        await writer.drain()
+        writer.close()
+
+    # the planning functions print warnings to stdout
+    output = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        server = await asyncio.start_unix_server(connection, path)
+        async with server:
+            await server.serve_forever()
+    finally:
+        sys.stdout = output
+
+async def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        description="Serve planning and collision requests as JSON lines.")
+    parser.add_argument("--socket", help="listen on this Unix socket instead of stdin/stdout")
+    parser.add_argument("--window-ms", type=float, default=2.0,
+                        help="how long to wait for more requests to batch (default 2)")
+    parser.add_argument("--max-batch", type=int, default=256,
+                        help="most requests in one batch (default 256)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="number of worker threads or processes (default 4)")
+    parser.add_argument("--processes", action="store_true",
+                        help="run batches in worker processes instead of threads")
+    options = parser.parse_args(arguments)
+
+    if (options.processes):
+        executor = concurrent.futures.ProcessPoolExecutor(options.workers)
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(options.workers)
+
+    service = PlanningService(executor, options.window_ms / 1000,
+                              options.max_batch, options.workers)
+    service.start()
+    try:
+        if (options.socket is not None):
+            await serveUnixSocket(service, options.socket)
+        else:
+            await serveStdio(service)
+    finally:
+        await service.stop()
+        executor.shutdown()
+
+
+instrumentation.registerModule(__name__)
+
+
+
+if "__main__" == __name__:
+    asyncio.run(main())
@@ -0,0 +1,314 @@
+import collisionDetection
+import instrumentation
+import robustPredicates
+
+
+def computeSignedArea(polygon):
+    """
+Shoelace formula.  Positive for polygons given counter-clockwise and
+negative for clockwise ones."""
+    return 0.5 * sum(polygon[i - 1][0] * polygon[i][1]
+                     - polygon[i][0] * polygon[i - 1][1]
+                     for i in range(len(polygon)))
+
+def counterClockwise(polygon):
+    """
+Returns the vertices of polygon as lists in counter-clockwise order."""
+    vertices = [ [ point[0], point[1] ] for point in polygon ]
+    if (computeSignedArea(vertices) < 0):
+        vertices.reverse()
+
+    return vertices
+
+def computeConvexHull(points):
+    """
+Computes the convex hull of points with Andrew's monotone chain algorithm,
+which sorts the points and then builds the lower and upper halves of the
+hull in one pass each, in O(n log n).  Returns the hull's vertices in
+counter-clockwise order without repeating the first one.  Points on the
+hull's sides are left out."""
+    points = sorted(set((point[0], point[1]) for point in points))
+    if (len(points) <= 2):
+        return [ list(point) for point in points ]
+
+    lower = [ ]
+    for point in points:
+        while (len(lower) >= 2
+               and robustPredicates.orientation(lower[-2], lower[-1], point) <= 0):
+            lower.pop()
+        lower.append(point)
+    upper = [ ]
+    for point in reversed(points):
+        while (len(upper) >= 2
+               and robustPredicates.orientation(upper[-2], upper[-1], point) <= 0):
+            upper.pop()
+        upper.append(point)
+
+    return [ list(point) for point in lower[:-1] + upper[:-1] ]
+
+def isConvex(polygon):
+    """
+Returns True if the counter-clockwise polygon never turns clockwise."""
+    return all(robustPredicates.orientation(polygon[i - 2], polygon[i - 1],
+                                            polygon[i]) >= 0
+               for i in range(len(polygon)))
+
+def isSimple(polygon):
+    """
+Returns True if no two sides of polygon touch except neighboring sides at
+their shared vertex.  This compares every pair of sides, so it is meant
+to be run once when an obstacle is prepared, not per query."""
+    n = len(polygon)
+    for i in range(n):
+        for j in range(i + 2, n):
+            if (i == 0 and j == n - 1):
+                # the first and last sides share the first vertex
+                continue
+            if (robustPredicates.doSegmentsIntersect(
+                    [ polygon[i - 1], polygon[i] ],
+                    [ polygon[j - 1], polygon[j] ])):
+                return False
+
+    return True
+
+def _removeCollinearVertices(polygon):
+    vertices = list(polygon)
+    i = 0
+    while (len(vertices) > 3 and i < len(vertices)):
+        if (robustPredicates.orientation(vertices[i - 1], vertices[i],
+                                         vertices[(i + 1) % len(vertices)]) == 0):
+            del vertices[i]
+            i = max(i - 1, 0)
+        else:
+            i = i + 1
+
+    return vertices
+
+def _isInTriangle(a, b, c, point):
+    return (robustPredicates.orientation(a, b, point) >= 0
+            and robustPredicates.orientation(b, c, point) >= 0
+            and robustPredicates.orientation(c, a, point) >= 0)
+
+def triangulatePolygon(polygon):
+    """
+Splits a simple polygon into triangles by ear clipping.  A vertex is an
+ear if it turns counter-clockwise and no other vertex lies in the triangle
+it makes with its neighbors, and cutting it off leaves a smaller simple
+polygon.  Returns a list of counter-clockwise triangles.
+
+Raises an AssertionError if no ear can be found, which only happens when
+polygon isn't simple."""
+    vertices = _removeCollinearVertices(counterClockwise(polygon))
+    triangles = [ ]
+
+    while (len(vertices) > 3):
+        for i in range(len(vertices)):
+            (previous, current, following) = \
+                (vertices[i - 1], vertices[i], vertices[(i + 1) % len(vertices)])
+            if (robustPredicates.orientation(previous, current, following) <= 0):
+                continue
+            if (any(_isInTriangle(previous, current, following, point)
+                    for point in vertices
+                    if point is not previous and point is not current
+                    and point is not following)):
+                continue
+
+            triangles.append([ previous, current, following ])
+            del vertices[i]
+            vertices = _removeCollinearVertices(vertices)
+            break
+        else:
+            assert False, "triangulatePolygon: polygon must be simple"
+
+    triangles.append(vertices)
+
+    return triangles
+
+def _mergeAcrossSide(piece1, piece2):
+    """
+If piece1 and piece2 share a side, returns the polygon made by joining them
+along it, otherwise None."""
+    for i in range(len(piece1)):
+        (a, b) = (piece1[i - 1], piece1[i])
+        for j in range(len(piece2)):
+            # a side shared by two counter-clockwise pieces runs in
+            # opposite directions in each
+            if (piece2[j - 1] == b and piece2[j] == a):
+                # walk piece1 from b around to a, then piece2 from a back to b
+                merged = piece1[i:] + piece1[:i]
+                rest = piece2[j:] + piece2[:j]
+                return merged + rest[1:-1]
+
+    return None
+
+def decomposeIntoConvexPolygons(polygon):
+    """
+Splits a simple polygon into convex pieces.  It is triangulated with
+triangulatePolygon() and then, as in the Hertel-Mehlhorn algorithm,
+neighboring pieces are merged wherever the result is still convex.  The
+result has at most four times as many pieces as the fewest possible, and a
+convex polygon comes back as a single piece."""
+    vertices = counterClockwise(polygon)
+    if (isConvex(vertices)):
+        return [ _removeCollinearVertices(vertices) ]
+
+    pieces = triangulatePolygon(vertices)
+    merged = True
+    while (merged):
+        merged = False
+        for i in range(len(pieces)):
+            for j in range(i + 1, len(pieces)):
+                candidate = _mergeAcrossSide(pieces[i], pieces[j])
+                if (candidate is not None and isConvex(candidate)):
+                    pieces[i] = _removeCollinearVertices(candidate)
+                    del pieces[j]
+                    merged = True
+                    break
+            if (merged):
+                break
+
+    return pieces
+
+def computeAABB(polygon):
+    """
+Returns [ minX, minY, maxX, maxY ] of the smallest axis-aligned box around
+polygon."""
+    return [ min(x for [x, _] in polygon), min(y for [_, y] in polygon),
+             max(x for [x, _] in polygon), max(y for [_, y] in polygon) ]
+
+def doAABBsOverlap(box1, box2):
+    return (box1[0] <= box2[2] and box2[0] <= box1[2]
+            and box1[1] <= box2[3] and box2[1] <= box1[3])
+
+def areConvexPolygonsSeparated(polygon1, polygon2):
+    """
+Separating axis test for two counter-clockwise convex polygons.  Returns
+True if some side of either polygon has the whole other polygon strictly
+on its outside, so polygons that only touch are not separated."""
+    for (polygon, other) in ((polygon1, polygon2), (polygon2, polygon1)):
+        for i in range(len(polygon)):
+            if (all(robustPredicates.orientation(polygon[i - 1], polygon[i],
+                                                 point) < 0
+                    for point in other)):
+                return True
+
+    return False
+
+def doConvexPolygonsIntersect(polygon1, polygon2):
+    """
+A faster alternative to collisionDetection.doTwoConvexPolygonsIntersect()
+for polygons that are already counter-clockwise, using
+areConvexPolygonsSeparated().  Degenerate polygons with fewer than three
+vertices are handled by collisionDetection."""
+    if (len(polygon1) < 3 or len(polygon2) < 3):
+        return collisionDetection.doTwoConvexPolygonsIntersect(polygon1,
+                                                               polygon2)
+
+    return not areConvexPolygonsSeparated(polygon1, polygon2)
+
+
+class PreparedObstacle:
+    """
+A possibly non-convex obstacle with everything collision queries need
+computed once up front: its bounding box, its convex hull and its convex
+pieces.  Queries check the box, then the hull, and only then the pieces, so
+most misses never look at the pieces at all, and every test that is done
+uses the fast convex path."""
+
+    def __init__(self, polygon):
+        self.vertices = counterClockwise(polygon)
+        self.aabb = computeAABB(self.vertices)
+        self.hull = computeConvexHull(self.vertices)
+        self.pieces = decomposeIntoConvexPolygons(self.vertices)
+        self.pieceAABBs = [ computeAABB(piece) for piece in self.pieces ]
+
+def prepareObstacle(polygon):
+    return PreparedObstacle(polygon)
+
+def isPointInPreparedObstacle(point, obstacle):
+    """
+Returns True if point is inside or on the boundary of the prepared
+obstacle."""
+    if (not doAABBsOverlap([ point[0], point[1], point[0], point[1] ],
+                           obstacle.aabb)):
+        return False
+    if (not _isInConvexPolygon(obstacle.hull, point)):
+        return False
+
+    return any(_isInConvexPolygon(piece, point) for piece in obstacle.pieces)
+
+def _isInConvexPolygon(polygon, point):
+    if (len(polygon) < 3):
+        return any(collisionDetection.doTwoSegmentsIntersect(
+            [ point, point ], [ polygon[i - 1], polygon[i] ])
+            for i in range(len(polygon)))
+
+    return all(robustPredicates.orientation(polygon[i - 1], polygon[i],
+                                            point) >= 0
+               for i in range(len(polygon)))
+
+def _doesSegmentIntersectConvexPolygon(p, q, polygon):
+    # a segment meets a convex polygon if it starts inside it or crosses or
+    # touches one of its sides
+    return (_isInConvexPolygon(polygon, p)
+            or any(robustPredicates.doSegmentsIntersect(
+                       [ p, q ], [ polygon[i - 1], polygon[i] ])
+                   for i in range(len(polygon))))
+
+def doesSegmentIntersectPreparedObstacle(p, q, obstacle):
+    """
+Returns True if the segment p-q touches the prepared obstacle, either
+crossing its boundary or lying inside it."""
+    box = computeAABB([ p, q ])
+    if (not doAABBsOverlap(box, obstacle.aabb)):
+        return False
+    if (not _doesSegmentIntersectConvexPolygon(p, q, obstacle.hull)):
+        return False
+
+    return any(doAABBsOverlap(box, pieceBox)
+               and _doesSegmentIntersectConvexPolygon(p, q, piece)
+               for (piece, pieceBox) in zip(obstacle.pieces, obstacle.pieceAABBs))
+
+def doesConvexPolygonIntersectPreparedObstacle(polygon, obstacle):
+    """
+Checks a convex polygon, such as a robot's footprint, against a prepared
+obstacle.  The polygon may be in either orientation."""
+    polygon = counterClockwise(polygon)
+    box = computeAABB(polygon)
+    if (not doAABBsOverlap(box, obstacle.aabb)):
+        return False
+    if (not doConvexPolygonsIntersect(polygon, obstacle.hull)):
+        return False
+
+    return any(doAABBsOverlap(box, pieceBox)
+               and doConvexPolygonsIntersect(polygon, piece)
+               for (piece, pieceBox) in zip(obstacle.pieces, obstacle.pieceAABBs))
+
+
+instrumentation.registerModule(__name__)
+
+
+
+if "__main__" == __name__:
+    print("computeConvexHull()")
+    print(computeConvexHull([[0, 0], [1, 0], [0.5, 0.5], [1, 1], [0, 1],
+                             [0.5, 0]]))  # [[0, 0], [1, 0], [1, 1], [0, 1]]
+
+    print("\ndecomposeIntoConvexPolygons()")
+    lShape = [[0, 0], [2, 0], [2, 1], [1, 1], [1, 2], [0, 2]]
+    print(decomposeIntoConvexPolygons(lShape))  # two pieces
+    print(decomposeIntoConvexPolygons([[0, 0], [1, 0], [1, 1], [0, 1]]))  # one piece
+
+    print("\nPreparedObstacle")
+    obstacle = prepareObstacle(lShape)
+    print(obstacle.hull)
+    print(isPointInPreparedObstacle([0.5, 1.5], obstacle))  # True
+    print(isPointInPreparedObstacle([1.5, 1.5], obstacle))  # False
+    print(doesConvexPolygonIntersectPreparedObstacle(
+        [[1.2, 1.2], [1.8, 1.2], [1.8, 1.8], [1.2, 1.8]], obstacle))  # False
+    print(doesConvexPolygonIntersectPreparedObstacle(
+        [[0.8, 1.2], [1.8, 1.2], [1.8, 1.8], [0.8, 1.8]], obstacle))  # True
+    print(doesSegmentIntersectPreparedObstacle([1.5, 1.5], [1.5, 3],
+                                               obstacle))  # False
+    print(doesSegmentIntersectPreparedObstacle([1.5, 1.5], [0.5, 1.5],
+                                               obstacle))  # True
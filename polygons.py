@@ -1,12 +1,73 @@
-import matplotlib.path as mplPath
+import os
 
+import instrumentation
 import linesAndSegments
 
+# set to "matplotlib" to answer inPolygon() with matplotlib.path, which
+# costs a large import on the first call
+CONTAINMENT_ENVIRONMENT_VARIABLE = "ME179P_CONTAINMENT"
+# up to this many points are tested in plain Python, so that planners asking
+# about one point at a time never import numpy
+SMALL_CONTAINMENT_QUERY = 16
+
+# set by _containsPoints() the first time it's needed, so that importing
+# this module doesn't import matplotlib or numpy
+_containsPointsImplementation = None
+
+
+def _containsPointsEvenOdd(polygon, testPoints):
+    """
+The even-odd rule of batchCollisionDetection.arePointsInPolygon() in plain
+Python, for a handful of points."""
+    inside = [ False ] * len(testPoints)
+    for i in range(len(polygon)):
+        (x1, y1) = polygon[i - 1]
+        (x2, y2) = polygon[i]
+        if (y1 == y2):
+            continue
+        for (k, (x, y)) in enumerate(testPoints):
+            if ((y1 > y) != (y2 > y)
+                and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1)):
+                inside[k] = not inside[k]
+
+    return inside
+
+def _containsPointsNumPy(polygon, testPoints):
+    if (len(testPoints) <= SMALL_CONTAINMENT_QUERY):
+        return _containsPointsEvenOdd(polygon, testPoints)
+
+    import batchCollisionDetection
+    return batchCollisionDetection.arePointsInPolygon(testPoints,
+                                                      polygon).tolist()
+
+def _containsPoints(polygon, testPoints):
+    """
+Returns which of testPoints are inside polygon, by the even-odd rule.
+Large batches use batchCollisionDetection's NumPy version.  If the
+ME179P_CONTAINMENT environment variable is "matplotlib" and matplotlib is
+installed, matplotlib.path.contains_points() is used instead.  Any import
+is deferred to the first call."""
+    global _containsPointsImplementation
+    if (_containsPointsImplementation is None):
+        _containsPointsImplementation = _containsPointsNumPy
+        if (os.environ.get(CONTAINMENT_ENVIRONMENT_VARIABLE, "") == "matplotlib"):
+            try:
+                import matplotlib.path as mplPath
+                _containsPointsImplementation = \
+                    lambda polygon, testPoints: \
+                    mplPath.Path(polygon).contains_points(testPoints)
+            except ImportError:
+                pass
+
+    return _containsPointsImplementation(polygon, testPoints)
+
 
 def inPolygon(testPoints, polygon):
     """
 matplotlib.path.contains_points() isn't consistent about what it
-returns if a testpoint is on a vertex, so I have to make it consistent."""
+returns if a testpoint is on a vertex, so I have to make it consistent.
+The inside test itself is the even-odd rule, unless matplotlib is selected
+with the ME179P_CONTAINMENT environment variable."""
     try:
         onVertex = [ ]
     
@@ -17,8 +78,7 @@ returns if a testpoint is on a vertex, so I have to make it consistent."""
                     onVertex[-1] = True
                     break
             
-            polygonPath = mplPath.Path(polygon)
-            polygonContainsPoints = polygonPath.contains_points(testPoints)
+            polygonContainsPoints = _containsPoints(polygon, testPoints)
             
             return [ a or b for (a, b) in zip(onVertex, polygonContainsPoints) ]
     except:
@@ -130,6 +190,10 @@ Finds the nearest segment to the polygon and the nearest point on that segment t
                  pointForTangentLine[1] - point[1] ]
 
 
+instrumentation.registerModule(__name__)
+
+
+
 if "__main__" == __name__:
     testPolygonTriangle = [ [ 0, 0 ], [ 1, 0 ], [ 0, 1 ] ]
 
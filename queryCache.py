@@ -0,0 +1,125 @@
+from collections import OrderedDict
+
+import collisionDetection
+import instrumentation
+import polygons
+
+
+class QueryCache:
+    """
+A bounded least recently used cache in front of
+polygons.computeDistancePointToPolygon() and
+collisionDetection.isPointInPolygon(), for planners that keep asking about
+the same obstacles at the same or nearly the same points, such as when
+following a boundary or revisiting grid cells.
+
+Query points are rounded to a grid of spacing resolution, and a query is
+answered from the cache if the same obstacle was asked about in the same
+grid cell before, so answers may be off by up to about resolution.  The
+obstacle is recognized by identity, and its vertices are compared with the
+ones the cached answers were computed for on every query, so if an obstacle
+list is changed in place its old answers are never used again."""
+
+    def __init__(self, maxSize=4096, resolution=1e-6):
+        assert maxSize > 0, "QueryCache: maxSize must be positive"
+        assert resolution > 0, "QueryCache: resolution must be positive"
+
+        self.maxSize = maxSize
+        self.resolution = resolution
+        self._entries = OrderedDict()
+        # id(obstacle) -> (vertices as tuples, generation)
+        self._obstacles = { }
+        self._nextGeneration = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _generation(self, obstacle):
+        vertices = tuple(tuple(vertex) for vertex in obstacle)
+        known = self._obstacles.get(id(obstacle))
+        if (known is not None and known[0] == vertices):
+            return known[1]
+
+        # a new obstacle, a changed one, or a new one that reused the id of
+        # one that was garbage collected; old entries can't match the new
+        # generation, so they just age out of the cache
+        if (known is not None):
+            self.invalidations = self.invalidations + 1
+        generation = self._nextGeneration
+        self._nextGeneration = generation + 1
+        self._obstacles[id(obstacle)] = (vertices, generation)
+
+        return generation
+
+    def _query(self, kind, compute, obstacle, point):
+        key = (kind, id(obstacle), self._generation(obstacle),
+               round(point[0] / self.resolution),
+               round(point[1] / self.resolution))
+
+        if (key in self._entries):
+            self.hits = self.hits + 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses = self.misses + 1
+        value = compute()
+        self._entries[key] = value
+        if (len(self._entries) > self.maxSize):
+            self._entries.popitem(last=False)
+
+        return value
+
+    def computeDistancePointToPolygon(self, polygon, point):
+        return self._query(
+            "distance",
+            lambda: polygons.computeDistancePointToPolygon(polygon, point),
+            polygon, point)
+
+    def isPointInPolygon(self, point, polygon):
+        return self._query(
+            "inside",
+            lambda: collisionDetection.isPointInPolygon(point, polygon),
+            polygon, point)
+
+    def invalidate(self, obstacle=None):
+        """
+Forgets the answers for obstacle, or for every obstacle if it's None.
+Changes to an obstacle's vertices are noticed automatically, so this is
+only needed to free the memory early."""
+        if (obstacle is None):
+            self._entries.clear()
+            self._obstacles.clear()
+        elif (id(obstacle) in self._obstacles):
+            del self._obstacles[id(obstacle)]
+            for key in [ key for key in self._entries if key[1] == id(obstacle) ]:
+                del self._entries[key]
+        self.invalidations = self.invalidations + 1
+
+    def getStatistics(self):
+        queries = self.hits + self.misses
+
+        return { "hits": self.hits,
+                 "misses": self.misses,
+                 "hitRate": self.hits / queries if queries > 0 else 0.0,
+                 "size": len(self._entries),
+                 "invalidations": self.invalidations }
+
+
+instrumentation.registerModule(__name__)
+
+
+
+if "__main__" == __name__:
+    triangle = [[0, 0], [1, 0], [0, 1]]
+    cache = QueryCache(resolution=0.01)
+
+    print("QueryCache")
+    print(cache.computeDistancePointToPolygon(triangle, [1.1, 0.1]))
+    print(cache.computeDistancePointToPolygon(triangle, [1.1001, 0.1]))  # hit
+    print(cache.isPointInPolygon([0.25, 0.25], triangle))  # True
+    print(cache.getStatistics())  # 1 hit, 2 misses
+
+    # moving the obstacle is noticed without calling invalidate()
+    triangle[1] = [2, 0]
+    print(cache.computeDistancePointToPolygon(triangle, [1.1, 0.1]))  # 0
+    print(cache.getStatistics())  # 1 hit, 3 misses, 1 invalidation
@@ -0,0 +1,129 @@
+import instrumentation
+
+# Error bound of the floating point orientation determinant from Shewchuk,
+# "Adaptive Precision Floating-Point Arithmetic and Fast Robust Geometric
+# Predicates".  If the determinant is bigger than this times the sum of the
+# magnitudes of its two products, its sign is certainly right.
+EPSILON = 2.0 ** -53
+ORIENTATION_ERROR_BOUND = (3.0 + 16.0 * EPSILON) * EPSILON
+
+_orientationTests = 0
+_exactFallbacks = 0
+
+
+def orientation(p, q, r):
+    """
+Returns 1 if the points p, q and r make a counter-clockwise turn, -1 if they
+make a clockwise turn and 0 if they are exactly co-linear.
+
+The determinant is first computed in floating point.  Only when it is too
+close to zero for its sign to be trusted is it recomputed exactly with
+fractions.Fraction, which is much slower but happens rarely, so the answer
+is always exact and usually cheap.  getPredicateStatistics() reports how
+often the slow path is taken."""
+    global _orientationTests, _exactFallbacks
+    _orientationTests = _orientationTests + 1
+
+    detLeft = (p[0] - r[0]) * (q[1] - r[1])
+    detRight = (p[1] - r[1]) * (q[0] - r[0])
+    determinant = detLeft - detRight
+    errorBound = ORIENTATION_ERROR_BOUND * (abs(detLeft) + abs(detRight))
+
+    if (determinant > errorBound):
+        return 1
+    elif (-determinant > errorBound):
+        return -1
+    elif (detLeft == 0 and detRight == 0):
+        # both products are exactly zero (e.g. repeated points or an axis
+        # aligned line), so the determinant is too
+        return 0
+
+    _exactFallbacks = _exactFallbacks + 1
+    # imported here since the exact path is rare and fractions is slow to
+    # import
+    from fractions import Fraction
+    (px, py, qx, qy, rx, ry) = (Fraction(p[0]), Fraction(p[1]),
+                                Fraction(q[0]), Fraction(q[1]),
+                                Fraction(r[0]), Fraction(r[1]))
+    exactDeterminant = (px - rx) * (qy - ry) - (py - ry) * (qx - rx)
+
+    return (exactDeterminant > 0) - (exactDeterminant < 0)
+
+def addOrientationTests(count):
+    """
+For callers that run the floating point filter of orientation() on many
+points at once, such as batchCollisionDetection, and call orientation()
+only for the points it can't decide.  Counts the count tests that were
+decided in bulk, so getPredicateStatistics() covers them too."""
+    global _orientationTests
+    _orientationTests = _orientationTests + count
+
+def isInSegmentBox(p, q, r):
+    """
+Returns True if r is inside the axis aligned box with corners p and q.  For
+an r that is co-linear with p and q, that means r is on the segment p-q.
+Comparisons of floats are exact, so no tolerance is needed."""
+    return (min(p[0], q[0]) <= r[0] <= max(p[0], q[0])
+            and min(p[1], q[1]) <= r[1] <= max(p[1], q[1]))
+
+def doSegmentsIntersect(segment1, segment2):
+    """
+Exact version of collisionDetection.doTwoSegmentsIntersect() without the
+input validation.  The segments intersect if each one's endpoints are on
+opposite sides of the other's line, or if an endpoint of one lies exactly
+on the other.  Nearly co-linear segments are decided correctly because
+orientation() is exact."""
+    [ a, b ] = segment1
+    [ c, d ] = segment2
+
+    o1 = orientation(a, b, c)
+    o2 = orientation(a, b, d)
+    o3 = orientation(c, d, a)
+    o4 = orientation(c, d, b)
+
+    if (o1 * o2 < 0 and o3 * o4 < 0):
+        return True
+
+    return ((o1 == 0 and isInSegmentBox(a, b, c))
+            or (o2 == 0 and isInSegmentBox(a, b, d))
+            or (o3 == 0 and isInSegmentBox(c, d, a))
+            or (o4 == 0 and isInSegmentBox(c, d, b)))
+
+def getPredicateStatistics():
+    """
+Returns a dictionary with the number of orientation tests done since the
+last reset, how many of them needed exact arithmetic, and the fraction that
+did."""
+    return { "orientationTests": _orientationTests,
+             "exactFallbacks": _exactFallbacks,
+             "fallbackRate": _exactFallbacks / _orientationTests
+                             if _orientationTests > 0 else 0.0 }
+
+def resetPredicateStatistics():
+    global _orientationTests, _exactFallbacks
+    _orientationTests = 0
+    _exactFallbacks = 0
+
+
+instrumentation.registerModule(__name__)
+
+
+
+if "__main__" == __name__:
+    print("orientation()")
+    print(orientation([0, 0], [1, 0], [0, 1]))  # 1
+    print(orientation([0, 0], [1, 0], [0, -1]))  # -1
+    print(orientation([0, 0], [1, 0], [2, 0]))  # 0
+    # 0.1 * 3 is slightly more than 0.3 in floating point, so this point is
+    # just above the line
+    print(orientation([0, 0], [0.1, 0.1], [0.3, 0.1 * 3]))  # 1
+    print(orientation([0.5, 0.5], [12, 12], [24, 24]))  # 0
+
+    print("\ndoSegmentsIntersect()")
+    print(doSegmentsIntersect([[0, 0], [1, 0]], [[0.5, 0], [1.5, 0]]))  # True
+    print(doSegmentsIntersect([[0, 0], [1, 0]], [[1 + 1e-16, 0], [2, 0]]))  # True, 1 + 1e-16 == 1
+    print(doSegmentsIntersect([[0, 0], [1, 0]], [[1 + 1e-15, 0], [2, 0]]))  # False
+    print(doSegmentsIntersect([[0, 0], [3, 1]], [[1, 1 / 3], [1, 1]]))  # True
+
+    print("\ngetPredicateStatistics()")
+    print(getPredicateStatistics())
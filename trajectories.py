@@ -0,0 +1,263 @@
+#
+# trajectories.py
+#
+# Compact containers for long paths and trajectories.  A list of [x, y]
+# lists costs about 120 bytes per point; these keep their numbers in one
+# contiguous buffer of doubles instead, 16 bytes per point for a Path2D and
+# 96 bytes per pose for a Pose3DTrajectory, and hand that buffer to NumPy
+# without copying.
+#
+
+import array
+import importlib
+import itertools
+
+import numpy as np
+
+import instrumentation
+
+
+class _DoubleRows:
+    """
+A sequence of rows of _width doubles each, stored in an array.array.
+Slicing with a step of 1 gives a new container that shares the buffer of
+the old one, so it costs the same no matter how many rows it covers.
+
+Writes through one container are seen by every container and NumPy view
+sharing its buffer.  Appending to a slice that ends before its buffer does
+first copies the slice, so it never overwrites rows of the container it came
+from.  Like any array.array, the buffer can't grow while a NumPy view or
+memoryview of it is alive, and appending then raises a BufferError."""
+
+    __slots__ = ( "_data", "_start", "_stop" )
+    _width = 1
+
+    def __init__(self, rows=()):
+        if (isinstance(rows, type(self))):
+            self._data = array.array("d", rows._view())
+        elif (isinstance(rows, np.ndarray)):
+            self._data = array.array("d")
+            self._data.frombytes(np.ascontiguousarray(rows, dtype=float).tobytes())
+        else:
+            self._data = array.array("d", itertools.chain.from_iterable(
+                self._flatten(row) for row in rows))
+        assert len(self._data) % self._width == 0, \
+            "%s: every row must have %d numbers" % (type(self).__name__,
+                                                   self._width)
+        self._start = 0
+        self._stop = len(self._data) // self._width
+
+    @classmethod
+    def _flatten(cls, row):
+        return row
+
+    @classmethod
+    def _share(cls, data, start, stop):
+        rows = cls.__new__(cls)
+        rows._data = data
+        rows._start = start
+        rows._stop = stop
+
+        return rows
+
+    def _view(self):
+        return memoryview(self._data)[self._width * self._start:
+                                      self._width * self._stop]
+
+    def _index(self, index):
+        if (index < 0):
+            index = index + len(self)
+        if (not 0 <= index < len(self)):
+            raise IndexError("%s index out of range" % type(self).__name__)
+
+        return self._width * (self._start + index)
+
+    def __len__(self):
+        return self._stop - self._start
+
+    @property
+    def nbytes(self):
+        return 8 * self._width * len(self)
+
+    def __getitem__(self, index):
+        if (isinstance(index, slice)):
+            (start, stop, step) = index.indices(len(self))
+            if (step == 1):
+                return self._share(self._data, self._start + start,
+                                   self._start + max(start, stop))
+            # a strided slice can't share a contiguous buffer
+            return type(self)(self[i] for i in range(start, stop, step))
+
+        return self._row(self._index(index))
+
+    def _appendRow(self, row):
+        if (self._stop * self._width != len(self._data)):
+            self._data = array.array("d", self._view())
+            self._stop = self._stop - self._start
+            self._start = 0
+        self._data.extend(row)
+        self._stop = self._stop + 1
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._row(self._width * (self._start + i))
+
+    def toNumPy(self):
+        """
+Returns a len(self) x _width NumPy array that is a view of the buffer,
+not a copy."""
+        return np.frombuffer(self._data, dtype=float) \
+                 .reshape(-1, self._width)[self._start:self._stop]
+
+    def __array__(self, dtype=None, copy=None):
+        if (copy):
+            return np.array(self.toNumPy(), dtype=dtype)
+        if (dtype is not None and np.dtype(dtype) != np.float64):
+            if (copy is False):
+                raise ValueError("%s: converting to %s needs a copy"
+                                 % (type(self).__name__, dtype))
+            return self.toNumPy().astype(dtype)
+
+        return self.toNumPy()
+
+    def toMemoryView(self):
+        """
+Returns a len(self) x _width memoryview of doubles on the buffer.  On
+Python 3.12 and later memoryview(rows) does the same.  memoryview can't
+have a zero in its shape, so an empty container gives an empty 1-D view."""
+        if (len(self) == 0):
+            return self._view()
+
+        return self._view().cast("B").cast("d", (len(self), self._width))
+
+    def __buffer__(self, flags):
+        return self.toMemoryView()
+
+    def copy(self):
+        return type(self)(self)
+
+    def toList(self):
+        return list(self)
+
+    def __eq__(self, other):
+        if (isinstance(other, _DoubleRows)):
+            return (type(self) == type(other)
+                    and self._view().tolist() == other._view().tolist())
+
+        return NotImplemented
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, self.toList())
+
+
+class Path2D(_DoubleRows):
+    """
+A path of points in the plane, 16 bytes per point.  Indexing and iterating
+give [ x, y ] lists like the ones the planners return, so the geometry
+functions accept a Path2D wherever they take a list of points, and
+np.asarray() of it is an N x 2 view without a copy."""
+
+    __slots__ = ( )
+    _width = 2
+
+    @classmethod
+    def _flatten(cls, point):
+        return ( point[0], point[1] )
+
+    def _row(self, offset):
+        return [ self._data[offset], self._data[offset + 1] ]
+
+    def __setitem__(self, index, point):
+        offset = self._index(index)
+        self._data[offset] = point[0]
+        self._data[offset + 1] = point[1]
+
+    def append(self, point):
+        self._appendRow(( point[0], point[1] ))
+
+    def extend(self, points):
+        for point in points:
+            self.append(point)
+
+
+class Pose3DTrajectory(_DoubleRows):
+    """
+A sequence of poses in space, each a rotation matrix, such as one from
+3dRotations.computeRMfromAA(), and a translation, stored as the nine
+entries of the matrix row by row followed by the translation, 96 bytes per
+pose.  Indexing gives a ( rotationMatrix, translation ) pair of new 3 x 3
+and length 3 arrays; rotations() and translations() give views of all of
+them at once."""
+
+    __slots__ = ( )
+    _width = 12
+
+    @classmethod
+    def _flatten(cls, pose):
+        (rotationMatrix, translation) = pose
+
+        return np.concatenate((np.asarray(rotationMatrix, dtype=float).reshape(9),
+                               np.asarray(translation, dtype=float).reshape(3)))
+
+    def _row(self, offset):
+        row = np.array(self._data[offset:offset + 12])
+
+        return (row[:9].reshape(3, 3), row[9:])
+
+    def __setitem__(self, index, pose):
+        offset = self._index(index)
+        self._data[offset:offset + 12] = array.array("d", self._flatten(pose))
+
+    def append(self, rotationMatrix, translation=(0, 0, 0)):
+        self._appendRow(self._flatten(( rotationMatrix, translation )))
+
+    def appendAxisAngle(self, angle, axis, translation=(0, 0, 0)):
+        rotations = importlib.import_module("3dRotations")
+        axis = np.asarray(axis, dtype=float).reshape(3)
+        self.append(rotations.computeRMfromAA(angle, axis), translation)
+
+    def rotations(self):
+        return self.toNumPy()[:, :9].reshape(-1, 3, 3)
+
+    def translations(self):
+        return self.toNumPy()[:, 9:]
+
+
+instrumentation.registerModule(__name__)
+
+
+
+if "__main__" == __name__:
+    import sys
+
+    import bug1
+    import pathOptimization
+    import polygons
+
+    obstacles = [ [[1, 2], [1, 0], [3, 0]], [[2, 3], [4, 1], [5, 2]] ]
+    points = bug1.computeBug1([0, 0], [5, 3], obstacles, 0.001)
+    path = Path2D(points)
+
+    print("Path2D")
+    listBytes = sys.getsizeof(points) + sum(sys.getsizeof(point)
+                                            + sum(map(sys.getsizeof, point))
+                                            for point in points)
+    print("%d points, %.1f bytes per point as lists, %.1f as a Path2D"
+          % (len(path), listBytes / len(points),
+             sys.getsizeof(path._data) / len(path)))
+
+    middle = path[100:200]  # no copy
+    view = np.asarray(middle)  # no copy either
+    print(view.shape, np.shares_memory(view, path.toNumPy()))  # (100, 2) True
+    del view
+
+    print(polygons.computeDistancePointToPolygon(obstacles[0], path[-1]))
+    print(pathOptimization.optimizePath(path, obstacles)[1]["compressionRatio"])
+
+    print("\nPose3DTrajectory")
+    poses = Pose3DTrajectory()
+    for i in range(4):
+        poses.appendAxisAngle(i * np.pi / 4, [0, 0, 1], [i, 0, 0])
+    print(len(poses), poses.nbytes)  # 4 384
+    print(poses[2][0].round(6))  # a quarter turn about z
+    print(poses.translations()[:, 0])  # [0. 1. 2. 3.]